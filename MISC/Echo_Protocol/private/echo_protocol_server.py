@@ -1,29 +1,237 @@
+import asyncio
+import math
+import os
 import socket
-import threading
-import time
 import random
-import select
+from collections import deque
 
 HOST = "0.0.0.0"
 PORT = 10123
 FLAG = "KCTF_Jr{ech0_y0ur_pati3nc3}"
 
 QUIZ_TRIGGER_COUNT = random.randint(25, 35)
+MAX_LINE = 1024  # 줄바꿈 없이 이만큼 오면 한 줄로 취급
+MAX_BUFFERED = 16 * 1024  # 세션당 읽어 둘 수 있는 최대 입력 (넘으면 소켓 읽기를 멈춤)
 
+# 세션 제한 (환경 변수로 변경 가능)
+IDLE_TIMEOUT = int(os.environ.get("ECHO_IDLE_TIMEOUT", "120"))  # 입력 없이 버틸 수 있는 시간 (초)
+SESSION_TIMEOUT = int(os.environ.get("ECHO_SESSION_TIMEOUT", "900"))  # 세션 최대 길이 (초)
+MAX_SESSIONS = int(os.environ.get("ECHO_MAX_SESSIONS", "20000"))  # 동시 세션 수
+STATS_INTERVAL = 60  # 세션 수/버퍼 사용량 출력 간격 (초)
 
-def handle_client(conn, addr):
-    conn.sendall(b"\n[ Welcome to the Echo Protocol ]\n")
-    time.sleep(0.5)
-    conn.sendall(b"Say something, and I will echo it back to you.\n")
-    time.sleep(0.5)
-    conn.sendall(b"Let's see if you truly belong here...\n\n")
-    time.sleep(0.5)
+
+class Timer:
+    def __init__(self, callback, rounds, slot):
+        self.callback = callback
+        self.rounds = rounds  # 슬롯을 몇 바퀴 더 지나야 만료되는지
+        self.slot = slot
+
+
+class TimerWheel:
+    """해시드 타이머 휠
+
+    세션마다 타이머 태스크를 두지 않고, 하나의 태스크가 tick마다 슬롯을 하나씩
+    돌며 만료된 타이머만 실행한다. 등록/취소는 O(1), 틱당 비용은 슬롯에 든
+    타이머 수에 비례한다.
+    """
+
+    def __init__(self, tick=1.0, size=256):
+        self.tick = tick
+        self.slots = [set() for _ in range(size)]
+        self.position = 0
+
+    def schedule(self, delay, callback):
+        # 다음 틱은 한 틱보다 빨리 올 수 있으므로 한 틱을 더해 일찍 만료되지 않게 함
+        ticks = max(0, math.ceil(delay / self.tick)) + 1
+        timer = Timer(callback, (ticks - 1) // len(self.slots), (self.position + ticks) % len(self.slots))
+        self.slots[timer.slot].add(timer)
+        return timer
+
+    def cancel(self, timer):
+        self.slots[timer.slot].discard(timer)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            self.position = (self.position + 1) % len(self.slots)
+            slot = self.slots[self.position]
+            for timer in list(slot):
+                if timer.rounds:
+                    timer.rounds -= 1
+                else:
+                    slot.discard(timer)
+                    timer.callback()
+
+
+class FramedReader:
+    """StreamReader 위에 줄 단위 프레이밍을 얹은 버퍼 리더
+
+    pump 태스크가 받은 청크마다 도착 시각을 붙여 쌓아 두므로, 패킷이 나뉘어
+    와도 줄 단위로 읽을 수 있다. 쌓인 입력이 MAX_BUFFERED를 넘으면 소비될 때까지
+    읽기를 멈추므로 (TCP 흐름 제어로 넘어감) 세션당 메모리가 제한된다.
+
+    begin_discard()부터 discard_before(T)까지는 흐름 제어 없이 계속 읽어서 바로
+    버리므로, 소켓이나 커널에 밀려 있던 입력까지 T 이전에 받은 것은 모두 버려진다.
+    """
+
+    total_buffered = 0  # 모든 세션이 쌓아 둔 입력 바이트 합계
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.chunks = deque()  # (도착 시각, 데이터)
+        self.buffered = 0
+        self.eof = False
+        self.discarding = False
+        self.arrived = asyncio.Event()
+        self.consumed = asyncio.Event()
+        self.last_activity = asyncio.get_running_loop().time()
+        self.pump_task = asyncio.create_task(self._pump())
+
+    async def _pump(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if self.buffered >= MAX_BUFFERED and not self.discarding:
+                    self.consumed.clear()
+                    await self.consumed.wait()
+                    continue
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                self.last_activity = loop.time()
+                if self.discarding:
+                    continue
+                self.chunks.append((self.last_activity, data))
+                self._account(len(data))
+                self.arrived.set()
+        except ConnectionError:
+            pass
+        finally:
+            self.eof = True
+            self.arrived.set()
+
+    async def readline(self):
+        """다음 줄 (줄바꿈 포함), 연결이 끊기고 남은 데이터가 없으면 b''"""
+        while True:
+            line = self._take_line()
+            if line is not None:
+                return line
+            if self.eof:
+                return self._take(self.buffered)
+            self.arrived.clear()
+            await self.arrived.wait()
+
+    def begin_discard(self):
+        """쌓인 입력을 버리고, discard_before()까지 들어오는 입력은 읽는 대로 버림"""
+        self.discarding = True
+        self.chunks.clear()
+        self._account(-self.buffered)
+
+    def discard_before(self, deadline):
+        """deadline 이전에 도착한 입력을 버리고 버린 바이트 수 반환 (버리기 모드 종료)"""
+        self.discarding = False
+        dropped = 0
+        while self.chunks and self.chunks[0][0] < deadline:
+            dropped += len(self.chunks.popleft()[1])
+        self._account(-dropped)
+        return dropped
+
+    def close(self):
+        self.pump_task.cancel()
+        self.chunks.clear()
+        self._account(-self.buffered)
+
+    def _account(self, delta):
+        self.buffered += delta
+        FramedReader.total_buffered += delta
+        if delta < 0:
+            self.consumed.set()
+
+    def _take_line(self):
+        size = 0
+        for _, chunk in self.chunks:
+            index = chunk.find(b"\n", 0, MAX_LINE - size)
+            if index >= 0:
+                return self._take(size + index + 1)
+            size += len(chunk)
+            if size >= MAX_LINE:
+                return self._take(MAX_LINE)
+        return None
+
+    def _take(self, size):
+        parts = []
+        while size > 0:
+            stamp, chunk = self.chunks[0]
+            if len(chunk) <= size:
+                self.chunks.popleft()
+                parts.append(chunk)
+                size -= len(chunk)
+            else:
+                parts.append(chunk[:size])
+                self.chunks[0] = (stamp, chunk[size:])
+                size = 0
+        data = b"".join(parts)
+        self._account(-len(data))
+        return data
+
+
+class Session:
+    """접속 하나의 유휴/전체 시간 제한
+
+    타이머는 공용 TimerWheel에 걸어 둔다. 유휴 타이머는 입력마다 다시 걸지 않고,
+    만료 시점에 마지막 입력 시각을 확인해 남은 만큼만 다시 건다.
+    """
+
+    def __init__(self, reader, writer, task):
+        self.reader = reader
+        self.writer = writer
+        self.task = task
+        self.idle_timer = timers.schedule(IDLE_TIMEOUT, self._check_idle)
+        self.session_timer = timers.schedule(SESSION_TIMEOUT, lambda: self.expire("Session time limit reached"))
+
+    def _check_idle(self):
+        idle = asyncio.get_running_loop().time() - self.reader.last_activity
+        if idle >= IDLE_TIMEOUT:
+            self.expire("Idle timeout")
+        else:
+            self.idle_timer = timers.schedule(IDLE_TIMEOUT - idle, self._check_idle)
+
+    def expire(self, reason):
+        if not self.writer.is_closing():
+            self.writer.write(f"\n[{reason}, session closed]\n".encode())
+        self.task.cancel()
+
+    def close(self):
+        timers.cancel(self.idle_timer)
+        timers.cancel(self.session_timer)
+        self.reader.close()
+
+
+timers = TimerWheel()
+sessions = set()
+
+
+async def send(writer, data):
+    writer.write(data)
+    await writer.drain()
+
+
+async def handle_client(reader, writer):
+    await send(writer, b"\n[ Welcome to the Echo Protocol ]\n")
+    await asyncio.sleep(0.5)
+    await send(writer, b"Say something, and I will echo it back to you.\n")
+    await asyncio.sleep(0.5)
+    await send(writer, b"Let's see if you truly belong here...\n\n")
+    await asyncio.sleep(0.5)
 
     count = 0
 
     while True:
-        conn.sendall(b"> ")
-        data = conn.recv(1024)
+        await send(writer, b"> ")
+        data = await reader.readline()
 
         if not data:
             break
@@ -32,63 +240,79 @@ def handle_client(conn, addr):
         count += 1
 
         # echo 출력
-        conn.sendall(f"You said: {msg}\n".encode())
+        await send(writer, f"You said: {msg}\n".encode())
 
         # 퀴즈 시작 조건
         if count == QUIZ_TRIGGER_COUNT:
-            conn.sendall(b"\n...Wait. Before we go on, answer this:\n")
-            time.sleep(1)
-            conn.sendall(b"What is the name of our club?\n")
-            time.sleep(0.5)
-            conn.sendall(b"> ")
-
-            # 버퍼 완전 클리어
-            conn.setblocking(0)
-            while True:
-                ready = select.select([conn], [], [], 0.1)[0]
-                if not ready:
-                    break
-                try:
-                    _ = conn.recv(1024)
-                except:
-                    break
-            conn.setblocking(1)
+            # 지금부터 프롬프트까지 들어오는 입력은 흐름 제어 없이 읽어서 버림
+            reader.begin_discard()
+            await send(writer, b"\n...Wait. Before we go on, answer this:\n")
+            await asyncio.sleep(1)
+            await send(writer, b"What is the name of our club?\n")
+            await asyncio.sleep(0.5)
+            await send(writer, b"> ")
+
+            # 프롬프트 전에 도착한 입력은 모두 버림
+            reader.discard_before(asyncio.get_running_loop().time())
 
             # 입력 받기
-            answer = conn.recv(1024).decode(errors="ignore").strip()
-            time.sleep(0.3)
-            conn.sendall(b"\n")
+            answer = (await reader.readline()).decode(errors="ignore").strip()
+            await asyncio.sleep(0.3)
+            await send(writer, b"\n")
 
             if answer.lower() == "kuality":
-                conn.sendall(b"Correct. You truly belong here.\n\n")
-                conn.sendall(f"{FLAG}\n\n".encode())
-                time.sleep(2.0)
+                await send(writer, b"Correct. You truly belong here.\n\n")
+                await send(writer, f"{FLAG}\n\n".encode())
+                await asyncio.sleep(2.0)
             else:
-                conn.sendall(b"Wrong. Maybe next time.\n\n")
+                await send(writer, b"Wrong. Maybe next time.\n\n")
 
-            time.sleep(0.5)
+            await asyncio.sleep(0.5)
             try:
-                conn.sendall(b"[Session closed]\n")
-            except BrokenPipeError:
+                await send(writer, b"[Session closed]\n")
+            except ConnectionError:
                 pass
-            time.sleep(0.5)
+            await asyncio.sleep(0.5)
             break
 
-    conn.close()
 
+async def on_connect(reader, writer):
+    # 스레드 대신 연결마다 코루틴 하나, 대기는 asyncio.sleep으로 이벤트 루프를 막지 않음
+    if len(sessions) >= MAX_SESSIONS:
+        try:
+            await send(writer, b"[Server is full, please try again later]\n")
+        except ConnectionError:
+            pass
+        writer.close()
+        return
 
-def main():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
-        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server.bind((HOST, PORT))
-        server.listen()
-        print(f"Listening on port {PORT}...")
-        while True:
-            conn, addr = server.accept()
-            threading.Thread(
-                target=handle_client, args=(conn, addr), daemon=True
-            ).start()
+    session = Session(FramedReader(reader), writer, asyncio.current_task())
+    sessions.add(session)
+    try:
+        await handle_client(session.reader, writer)
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        session.close()
+        sessions.discard(session)
+        writer.close()
+
+
+def report_stats():
+    print(f"[stats] sessions={len(sessions)} buffered={FramedReader.total_buffered} bytes", flush=True)
+    timers.schedule(STATS_INTERVAL, report_stats)
+
+
+async def main():
+    # limit: StreamReader 내부 버퍼도 작게 유지 (2 * limit을 넘으면 읽기 일시 중지)
+    server = await asyncio.start_server(
+        on_connect, HOST, PORT, reuse_address=True, backlog=socket.SOMAXCONN, limit=4096
+    )
+    timers.schedule(STATS_INTERVAL, report_stats)
+    print(f"Listening on port {PORT}...")
+    async with server:
+        await asyncio.gather(server.serve_forever(), timers.run())
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "private"))
+
+import echo_protocol_server as server  # noqa: E402
+
+QUIZ_PROMPT = b"What is the name of our club?\n> "
+
+
+class QuizDiscardTest(unittest.IsolatedAsyncioTestCase):
+    """퀴즈 프롬프트 전에 보낸 입력은 양과 상관없이 답으로 쓰이지 않아야 함"""
+
+    async def asyncSetUp(self):
+        patcher = mock.patch.object(server, "QUIZ_TRIGGER_COUNT", 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = await asyncio.start_server(server.on_connect, "127.0.0.1", 0, limit=4096)
+        self.timers = asyncio.create_task(server.timers.run())
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.timers.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def send(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def result(self):
+        output = await asyncio.wait_for(self.reader.read(), timeout=10)
+        return b"Correct" in output, output
+
+    async def test_flood_past_buffer_limit_before_prompt(self):
+        await self.send(b"hello\n")
+        await self.send(b"x" * (server.MAX_BUFFERED * 6) + b"\n")
+        await asyncio.wait_for(self.reader.readuntil(QUIZ_PROMPT), timeout=10)
+        await self.send(b"kuality\n")
+        correct, output = await self.result()
+        self.assertTrue(correct, output)
+
+    async def test_early_answer_is_discarded(self):
+        await self.send(b"hello\nKUality\n")
+        await asyncio.wait_for(self.reader.readuntil(QUIZ_PROMPT), timeout=10)
+        await self.send(b"nope\n")
+        correct, output = await self.result()
+        self.assertFalse(correct, output)
+        self.assertIn(b"Wrong", output)
+
+    async def test_answer_split_across_packets(self):
+        await self.send(b"hello\n")
+        await asyncio.wait_for(self.reader.readuntil(QUIZ_PROMPT), timeout=10)
+        await self.send(b"kua")
+        await asyncio.sleep(0.1)
+        await self.send(b"lity\n")
+        correct, output = await self.result()
+        self.assertTrue(correct, output)
+
+
+if __name__ == "__main__":
+    unittest.main()
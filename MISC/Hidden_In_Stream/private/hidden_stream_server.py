@@ -1,112 +1,574 @@
 #!/usr/bin/env python3
 import asyncio
+import os
 import random
 import logging
+import mmap
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from typing import Optional
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# 공용 모듈: 컨테이너에서는 이 파일 옆에 ADD되고, 저장소에서는 common/ 아래에 있음
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'common'))
+from server_common import (AdmissionController, AdmissionRejected, MetricsRegistry,  # noqa: E402
+                           monitor_event_loop_lag, setup_logging)
+
+# 이벤트 종류별 샘플링 비율 (0~1)과 초당 최대 기록 수
+LOG_SAMPLE_RATES = {'stream_progress': 0.1}
+LOG_RATE_LIMITS = {'stream_progress': 20}
+
+
+class ConnectionSlots:
+    """동시 접속 수 카운터"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+
+    def try_acquire(self) -> bool:
+        """빈 자리가 있으면 하나 차지하고 True 반환"""
+        if self.in_use >= self.limit:
+            return False
+        self.in_use += 1
+        return True
+
+    def release(self) -> None:
+        self.in_use -= 1
+
+
+class NoiseGenerator:
+    """바이트 단위 랜덤 선택과 같은 분포의 노이즈를 청크 단위로 생성
+
+    원래 분포는 출력 가능한 ASCII(0x20~0x7E) / 확장 ASCII(0x80~0xFF) / 특수 문자
+    (NUL, LF, CR, TAB) 중 하나를 1/3 확률로 고른 뒤 그 안에서 균일하게 값을 고른다.
+    종류 선택과 후보 값들을 os.urandom + bytes.translate로 한 번에 만들고 (균일성이
+    깨지는 값은 translate의 delete 인자로 버림), 위치별 선택은 큰 정수의 비트
+    연산으로 합치므로 바이트마다 파이썬 코드가 실행되지 않는다.
+    """
+
+    SPECIAL_BYTES = bytes([0x00, 0x0A, 0x0D, 0x09])
+
+    def __init__(self):
+        # 종류: 0~251 → v % 3 (252 이상은 버림), 특수 문자는 (v // 3) % 4로 같은 바이트에서 선택
+        self._kind_reject = bytes(range(252, 256))
+        self._kind_masks = [bytes(0xFF if v % 3 == kind else 0x00 for v in range(256)) for kind in range(3)]
+        self._special = bytes(self.SPECIAL_BYTES[(v // 3) % 4] for v in range(256))
+        # 출력 가능한 ASCII: 0~189 → 0x20 + v % 95 (190 이상은 버림)
+        self._printable = bytes(0x20 + v % 95 for v in range(256))
+        self._printable_reject = bytes(range(190, 256))
+        # 확장 ASCII: 하위 7비트 사용
+        self._extended = bytes(0x80 | v for v in range(256))
+
+    @staticmethod
+    def _sample(n: int, table: Optional[bytes], reject: bytes) -> bytes:
+        """os.urandom 바이트를 table로 변환하고 reject 값을 버려 n바이트를 채움"""
+        accepted = 256 - len(reject)
+        out = b''
+        while len(out) < n:
+            need = n - len(out)
+            out += os.urandom(need * 256 // accepted + 32).translate(table, reject)
+        return out[:n]
+
+    def generate(self, n: int) -> bytes:
+        """노이즈 n바이트 생성"""
+        if n <= 0:
+            return b''
+
+        kinds = self._sample(n, None, self._kind_reject)
+        candidates = (
+            self._sample(n, self._printable, self._printable_reject),
+            os.urandom(n).translate(self._extended),
+            kinds.translate(self._special),
+        )
+
+        result = 0
+        for values, mask_table in zip(candidates, self._kind_masks):
+            mask = int.from_bytes(kinds.translate(mask_table), 'big')
+            result |= int.from_bytes(values, 'big') & mask
+        return result.to_bytes(n, 'big')
+
+
+class NoiseCorpus:
+    """시작 시 한 번 만들어 두고 모든 연결이 공유하는 노이즈 코퍼스
+
+    메모리 파일(memfd, 없으면 임시 파일)에 노이즈를 채워 MAP_SHARED로 매핑하고,
+    연결마다 임의 오프셋부터 memoryview 슬라이스나 sendfile로 내보내므로 연결당
+    노이즈 생성/복사가 없다.
+    스트림이 코퍼스보다 길면 처음으로 돌아가 이어서 보낸다.
+    """
+
+    FILL_BLOCK = 1 << 20  # 코퍼스를 채울 때 한 번에 생성하는 크기
+
+    def __init__(self, size: int, generator: NoiseGenerator):
+        self.size = size
+        try:
+            self.file = open(os.memfd_create('hidden-stream-noise'), 'r+b', buffering=0)
+        except (AttributeError, OSError):
+            self.file = tempfile.TemporaryFile()
+        self.file.truncate(size)
+        self.buffer = mmap.mmap(self.file.fileno(), size)
+        for offset in range(0, size, self.FILL_BLOCK):
+            length = min(self.FILL_BLOCK, size - offset)
+            self.buffer[offset:offset + length] = generator.generate(length)
+        self.view = memoryview(self.buffer).toreadonly()
+
+    def random_offset(self) -> int:
+        return random.randrange(self.size)
+
+
+class TokenBucket:
+    """바이트 단위 토큰 버킷 (rate=0이면 제한 없음)
+
+    토큰이 모자라면 빚을 지고 그만큼 잠들기 때문에, 여러 연결이 같은 버킷을
+    나눠 써도 전체 전송률이 rate를 넘지 않는다.
+    """
+
+    def __init__(self, rate: int, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(rate // 10, 1024)  # 기본값: 0.1초 분량
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def consume(self, amount: int) -> float:
+        """amount 바이트만큼 토큰을 쓰고, 기다린 시간을 반환"""
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        delay = -self.tokens / self.rate
+        await asyncio.sleep(delay)
+        return delay
+
+
+class EgressScheduler:
+    """활성 스트림들에 전송 차례를 라운드 로빈으로 나눠 주는 스케줄러
+
+    스트림은 청크를 보내기 전에 request()로 차례를 기다린다. 스트림마다 대기 중인
+    요청은 하나뿐이라 FIFO 순서가 곧 라운드 로빈이고, 청크는 quantum 바이트로
+    제한되므로 바이트 기준으로도 공평하다. 전체 전송률 제한은 디스패처가 차례를
+    줄 때 적용되므로 빨리 읽는 클라이언트가 대역폭을 먼저 가져가지 못한다.
+    소켓이 막혀 drain 중인 스트림은 대기열에 없으므로 다른 스트림의 차례를 막지 않는다.
+    """
+
+    def __init__(self, quantum: int, bucket: TokenBucket):
+        self.quantum = quantum
+        self.bucket = bucket
+        self.waiting = deque()  # (future, 바이트 수)
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._dispatch())
+
+    async def request(self, size: int) -> None:
+        """size바이트를 보낼 차례가 올 때까지 대기"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append((future, size))
+        self.wakeup.set()
+        await future
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self.waiting:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            future, size = self.waiting.popleft()
+            if future.done():  # 연결이 끊겨 취소된 요청
+                continue
+            await self.bucket.consume(size)
+            if not future.done():
+                future.set_result(None)
+            # 차례를 받은 스트림이 전송할 수 있도록 양보
+            await asyncio.sleep(0)
+
+
+class StreamState:
+    """연결 하나의 스트림 진행 상태"""
+
+    def __init__(self, corpus_start: int, bucket: TokenBucket, progress_interval: int):
+        self.corpus_start = corpus_start  # 코퍼스에서 이 스트림이 시작하는 위치
+        self.bucket = bucket  # 연결별 전송률 제한
+        self.noise_sent = 0
+        self.bytes_sent = 0
+        self.progress_interval = progress_interval  # 진행 상황 로그 간격
+        self.next_progress = progress_interval
+        self.compressor = None  # COMPRESS 협상 시 zlib 압축 객체
+        self.flush_interval = 0  # 압축 모드에서 Z_SYNC_FLUSH 간격 (입력 바이트)
+        self.unflushed = 0
+        self.wire_bytes = 0  # 압축 후 실제로 전송한 바이트
+        self.first_line = None  # 클라이언트의 첫 줄(옵션 명령)을 읽는 태스크
 
 
 class ProblemServer:
     FLAG = "KCTF_Jr{h1dd3n_1n_th3_str34m_2025}"
-    TOTAL_BYTES = 100000  # 10만 바이트
+    TOTAL_BYTES = int(os.environ.get('STREAM_BYTES', '100000'))  # 기본 10만 바이트
+    MAX_CONNECTIONS = 50
+    MAX_WAITING = 50  # 자리가 날 때까지 대기열에 세울 최대 인원
+    MAX_CONNECTIONS_PER_IP = 10  # IP당 접속 + 대기 최대 수
+    ADMISSION_TIMEOUT = 60  # 대기열에서 기다릴 수 있는 최대 시간 (초)
+
+    # 한 번에 보내는 노이즈 크기는 전송 버퍼의 high-water mark까지 남은 양에 맞춘다
+    # (스케줄러가 한 번에 허용하는 EGRESS_QUANTUM을 넘지 않음)
+    MIN_CHUNK_SIZE = 1024
+    EGRESS_QUANTUM = int(os.environ.get('STREAM_EGRESS_QUANTUM', str(64 * 1024)))
+
+    # 코퍼스 구간을 sendfile로 전송 (STREAM_SENDFILE=1, 코퍼스 모드에서만)
+    USE_SENDFILE = os.environ.get('STREAM_SENDFILE', '0') == '1'
+
+    # COMPRESS 협상 시 기본 압축 레벨과 Z_SYNC_FLUSH 간격 (클라이언트가 바꿀 수 있음)
+    COMPRESS_LEVEL = int(os.environ.get('STREAM_COMPRESS_LEVEL', '6'))
+    COMPRESS_FLUSH_INTERVAL = int(os.environ.get('STREAM_COMPRESS_FLUSH', str(64 * 1024)))
+    MAX_COMPRESS_FLUSH_INTERVAL = 16 * 1024 * 1024
+
+    # 전송률 제한 (바이트/초, 0이면 제한 없음)
+    RATE_LIMIT = int(os.environ.get('STREAM_RATE_LIMIT', '0'))  # 연결별
+    GLOBAL_RATE_LIMIT = int(os.environ.get('STREAM_GLOBAL_RATE_LIMIT', '0'))  # 프로세스 전체
+
+    # 공유 노이즈 코퍼스 크기 (NOISE_CORPUS_SIZE=0이면 연결마다 노이즈 생성)
+    NOISE_CORPUS_SIZE = int(os.environ.get('NOISE_CORPUS_SIZE', str(8 * 1024 * 1024)))
+
+    # 메트릭 HTTP 엔드포인트 (METRICS_PORT=0이면 비활성화)
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', '9500'))
 
     def __init__(self, host: str, port: int):
         self.host = host
         self.port = port
+        self.lag_monitor = None
+        self.noise = NoiseGenerator()
+        self.corpus = None
+        if self.NOISE_CORPUS_SIZE > 0:
+            self.corpus = NoiseCorpus(self.NOISE_CORPUS_SIZE, self.noise)
+        self.use_sendfile = self.USE_SENDFILE and self.corpus is not None
+        self.connection_slots = ConnectionSlots(self.MAX_CONNECTIONS)
+        self.admission = AdmissionController(self.connection_slots, self.MAX_WAITING, self.MAX_CONNECTIONS_PER_IP)
+        self.egress = EgressScheduler(self.EGRESS_QUANTUM, TokenBucket(self.GLOBAL_RATE_LIMIT))
+
+        # 메트릭
+        self.metrics = MetricsRegistry()
+        self.metric_active = self.metrics.gauge('stream_active_connections', 'Currently connected clients')
+        self.metric_connections = self.metrics.counter('stream_connections_total', 'Accepted connections')
+        self.metric_rejected = self.metrics.counter(
+            'stream_rejected_connections_total', 'Connections refused by admission control', ('reason',))
+        self.metric_waiting = self.metrics.gauge('stream_admission_queue_length', 'Clients waiting for a free slot')
+        self.metric_admission_wait = self.metrics.histogram(
+            'stream_admission_wait_seconds', 'Time from connect to being admitted')
+        self.metric_bytes_sent = self.metrics.counter('stream_bytes_sent_total', 'Bytes written to clients')
+        self.metric_drain_wait = self.metrics.histogram('stream_drain_wait_seconds', 'Time spent in writer.drain()')
+        self.metric_stream_duration = self.metrics.histogram(
+            'stream_duration_seconds', 'Time to deliver a complete stream', ('result',))
+        self.metric_loop_lag = self.metrics.histogram('stream_event_loop_lag_seconds', 'Event loop wake-up delay')
+        self.metric_corpus_size = self.metrics.gauge('stream_noise_corpus_bytes', 'Size of the shared noise corpus')
+        self.metric_corpus_size.set(self.corpus.size if self.corpus else 0)
+        self.metric_throttle_wait = self.metrics.histogram(
+            'stream_throttle_wait_seconds', 'Time spent waiting for per-connection rate limit tokens')
+        self.metric_egress_wait = self.metrics.histogram(
+            'stream_egress_wait_seconds', 'Time spent waiting for a turn from the egress scheduler')
+        self.metric_egress_queue = self.metrics.gauge(
+            'stream_egress_queue_length', 'Streams waiting for their egress turn')
+        self.metric_compress_in = self.metrics.counter(
+            'stream_compress_input_bytes_total', 'Stream bytes fed to zlib in compressed sessions')
+        self.metric_compress_out = self.metrics.counter(
+            'stream_compress_output_bytes_total', 'Compressed bytes produced by zlib')
+        self.metric_compress_time = self.metrics.counter(
+            'stream_compress_seconds_total', 'Time spent compressing stream data')
 
     async def run(self):
+        if self.METRICS_PORT:
+            await self.metrics.serve(self.METRICS_HOST, self.METRICS_PORT)
+            self.lag_monitor = asyncio.create_task(monitor_event_loop_lag(self.metric_loop_lag))
+            logging.info(f"Metrics available at http://{self.METRICS_HOST}:{self.METRICS_PORT}/metrics")
+
+        self.egress.start()
         server = await asyncio.start_server(self.on_connect, host=self.host, port=self.port)
         logging.info(f"Hidden Stream Server started on {self.host}:{self.port}")
         logging.info(f"Total stream size: {self.TOTAL_BYTES} bytes")
+        logging.info(f"Maximum concurrent streams: {self.MAX_CONNECTIONS}")
+        if self.corpus:
+            mode = 'sendfile' if self.use_sendfile else 'memoryview'
+            logging.info(f"Serving noise from a shared {self.corpus.size}-byte corpus ({mode})")
+        if self.RATE_LIMIT or self.GLOBAL_RATE_LIMIT:
+            logging.info(f"Rate limits: {self.RATE_LIMIT or 'unlimited'} B/s per connection, "
+                         f"{self.GLOBAL_RATE_LIMIT or 'unlimited'} B/s global")
         logging.info("Flag will be hidden somewhere in the stream...")
         await server.wait_closed()
 
     async def on_connect(self, reader, writer):
         peername = writer.get_extra_info('peername')
+        ip = peername[0] if peername else 'unknown'
+        loop = asyncio.get_running_loop()
+        connected_at = loop.time()
+
+        async def notify_position(position: int) -> bool:
+            self.metric_waiting.set(len(self.admission.waiting))
+            message = f"⏳ Server busy, you are in queue position {position}. Please wait...\n"
+            return await self.safe_write(writer, message.encode())
+
+        # 스트림이 끝날 때까지 자리를 잡아 둔다
+        try:
+            await self.admission.acquire(ip, notify_position, self.ADMISSION_TIMEOUT)
+        except AdmissionRejected as e:
+            self.metric_rejected.inc(reason=e.reason)
+            self.metric_waiting.set(len(self.admission.waiting))
+            logging.warning(f"Connection from {peername} rejected: {e} "
+                            f"({self.connection_slots.in_use}/{self.MAX_CONNECTIONS} in use, "
+                            f"{len(self.admission.waiting)} waiting)")
+            await self.safe_write(writer, f"❌ {e}, please try again later.\n".encode())
+            writer.close()
+            return
+
+        self.metric_admission_wait.observe(loop.time() - connected_at)
+        self.metric_waiting.set(len(self.admission.waiting))
         logging.info(f"Client connected: {peername}")
+        self.metric_active.inc()
+        self.metric_connections.inc()
 
-        def cleanup(fu):
-            try:
-                fu.result()
-            except Exception as e:
-                logging.error(f"Exception in client connection: {e}")
+        try:
+            await self.handle_client(reader, writer)
+        except Exception as e:
+            logging.error(f"Exception in client connection: {e}")
+        finally:
+            self.admission.release(ip)
+            self.metric_active.dec()
             logging.info(f"Client disconnected: {peername}")
 
-        task = asyncio.create_task(self.handle_client(reader, writer))
-        task.add_done_callback(cleanup)
-
     async def handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
         try:
             await self.handle_problem(reader, writer)
+            self.metric_stream_duration.observe(loop.time() - started, result='complete')
         except Exception as e:
+            self.metric_stream_duration.observe(loop.time() - started, result='error')
             logging.error(f"Error handling client: {e}")
         finally:
             writer.close()
             await writer.wait_closed()
 
     async def handle_problem(self, reader, writer):
-        # 각 연결마다 새로운 플래그 위치 생성
-        flag_position = random.randint(20000, 80000)
+        # 각 연결마다 새로운 플래그 위치 생성 (스트림의 20%~80% 구간)
+        flag_position = random.randint(self.TOTAL_BYTES // 5, self.TOTAL_BYTES * 4 // 5)
         logging.debug(f"Flag will be inserted at position {flag_position}")
 
         # 초기 메시지
         welcome_msg = b"Welcome to Hidden Stream Challenge!\n"
-        welcome_msg += b"I will send you 100,000 bytes... Can you find the hidden flag?\n"
-        welcome_msg += b"Starting stream...\n\n"
-        writer.write(welcome_msg)
-        await writer.drain()
-
-        # 랜덤 바이트 스트림 생성 및 전송
-        bytes_sent = 0
-        flag_bytes = self.FLAG.encode()
-        flag_inserted = False
-
-        # 버퍼링을 위한 청크 크기
-        chunk_size = 1024
-        buffer = bytearray()
-
-        while bytes_sent < self.TOTAL_BYTES:
-            # 플래그를 삽입할 위치에 도달했는지 확인
-            if not flag_inserted and bytes_sent + len(buffer) >= flag_position:
-                # 플래그 위치까지 채우기
-                while len(buffer) < flag_position - bytes_sent:
-                    buffer.append(self.generate_random_byte())
-
-                # 플래그 삽입
-                buffer.extend(flag_bytes)
-                flag_inserted = True
-                logging.info(f"Flag inserted at position {flag_position}")
-            else:
-                # 랜덤 바이트 생성
-                buffer.append(self.generate_random_byte())
+        welcome_msg += f"I will send you {self.TOTAL_BYTES:,} bytes... Can you find the hidden flag?\n".encode()
+        self.write(writer, welcome_msg)
+        await self.drain(writer)
 
-            # 버퍼가 충분히 차면 전송
-            if len(buffer) >= chunk_size or bytes_sent + len(buffer) >= self.TOTAL_BYTES:
-                writer.write(buffer)
-                await writer.drain()
-                bytes_sent += len(buffer)
-                buffer.clear()
+        state = StreamState(
+            corpus_start=self.corpus.random_offset() if self.corpus else 0,
+            bucket=TokenBucket(self.RATE_LIMIT),
+            progress_interval=max(10000, self.TOTAL_BYTES // 10),
+        )
+        # 옵션 명령은 기다리지 않고 스트림과 함께 읽어서 도착한 뒤의 청크부터 적용
+        state.first_line = asyncio.create_task(reader.readline())
+        try:
+            self.write(writer, b"Starting stream...\n\n")
+            await self.drain(writer)
 
-                # 진행 상황 로그 (1만 바이트마다)
-                if bytes_sent % 10000 == 0:
-                    logging.debug(f"Sent {bytes_sent} bytes")
+            # 플래그 앞뒤의 노이즈를 나눠 보내고 그 사이에 플래그를 따로 전송
+            flag_bytes = self.FLAG.encode()
+            await self.send_noise(writer, state, flag_position)
+            self.apply_options(writer, state)
+            self.send(writer, state, flag_bytes)
+            state.bytes_sent += len(flag_bytes)
+            logging.info(f"Flag inserted at position {flag_position}")
+            await self.send_noise(writer, state, self.TOTAL_BYTES - flag_position)
+        finally:
+            if state.first_line:
+                state.first_line.cancel()
 
         # 완료 메시지
         complete_msg = b"\n\n[+] Stream complete! Did you find the flag?\n"
-        writer.write(complete_msg)
-        await writer.drain()
+        self.send(writer, state, complete_msg)
+        if state.compressor:
+            tail = state.compressor.flush()
+            state.wire_bytes += len(tail)
+            self.metric_compress_out.inc(len(tail))
+            self.write(writer, tail)
+        await self.drain(writer)
+
+        if state.compressor:
+            logging.info(f"Stream complete! Sent total of {state.bytes_sent} bytes "
+                         f"({state.wire_bytes} bytes compressed)")
+        else:
+            logging.info(f"Stream complete! Sent total of {state.bytes_sent} bytes")
+
+    def apply_options(self, writer, state: StreamState) -> None:
+        """클라이언트의 첫 줄이 도착했으면 옵션 명령으로 해석해서 적용
+
+        스트림은 기다리지 않고 바로 시작하므로 명령은 도착한 뒤의 청크 경계에서
+        적용된다. 응답 줄은 평문으로 보내고, 첫 줄을 보내지 않은 클라이언트는
+        평문 스트림을 그대로 받는다.
+
+          COMPRESS [level [flush]]  응답 줄 이후의 모든 바이트를 zlib 스트림으로 전송
+                                    (level 0~9, flush는 Z_SYNC_FLUSH 간격 바이트)
+        """
+        task = state.first_line
+        if task is None or not task.done():
+            return
+        state.first_line = None
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        command = task.result().decode(errors='ignore').split()
+        if not command:
+            return
 
-        logging.info(f"Stream complete! Sent total of {bytes_sent} bytes")
+        if command[0] == 'COMPRESS' and len(command) <= 3:
+            try:
+                level = int(command[1]) if len(command) > 1 else self.COMPRESS_LEVEL
+                flush = int(command[2]) if len(command) > 2 else self.COMPRESS_FLUSH_INTERVAL
+            except ValueError:
+                level = flush = -1
+            if 0 <= level <= 9 and self.MIN_CHUNK_SIZE <= flush <= self.MAX_COMPRESS_FLUSH_INTERVAL:
+                reply = f"COMPRESS OK zlib level={level} flush={flush}\n"
+                logging.info(f"Client negotiated zlib compression (level {level}, flush every {flush} bytes) "
+                             f"after {state.bytes_sent} bytes")
+            else:
+                level = None
+                reply = (f"COMPRESS FAILED: level must be 0-9 and flush "
+                         f"{self.MIN_CHUNK_SIZE}-{self.MAX_COMPRESS_FLUSH_INTERVAL}\n")
+        else:
+            level = None
+            reply = f"Unknown option: {' '.join(command)[:20]}\n"
+
+        # 응답 줄이 노이즈 중간에 붙지 않도록 줄을 바꿔서 전송
+        self.write(writer, b"\n" + reply.encode())
+        if level is not None:
+            state.compressor = zlib.compressobj(level)
+            state.flush_interval = flush
+
+    async def send_noise(self, writer, state: StreamState, length: int) -> None:
+        """노이즈 length바이트를 전송률 제한에 맞춰 전송"""
+        end = state.noise_sent + length
+        while state.noise_sent < end:
+            self.apply_options(writer, state)
+            # 압축 모드에서는 데이터를 거쳐 가야 하므로 sendfile을 쓰지 않는다
+            use_sendfile = self.use_sendfile and state.compressor is None
+            size = min(self.chunk_size(writer.transport, state.bucket, use_sendfile), end - state.noise_sent)
+
+            if self.corpus:
+                position = (state.corpus_start + state.noise_sent) % self.corpus.size
+                size = min(size, self.corpus.size - position)
+                await self.throttle(state.bucket, size)
+                if use_sendfile:
+                    await self.sendfile(writer, position, size)
+                else:
+                    self.send(writer, state, self.corpus.view[position:position + size])
+                    await self.drain(writer)
+            else:
+                await self.throttle(state.bucket, size)
+                self.send(writer, state, self.noise.generate(size))
+                await self.drain(writer)
+
+            state.noise_sent += size
+            state.bytes_sent += size
+
+            # 진행 상황 로그
+            if state.noise_sent >= state.next_progress:
+                state.next_progress += state.progress_interval
+                logging.debug(f"Sent {state.bytes_sent} bytes", extra={'event': 'stream_progress'})
+
+    def send(self, writer, state: StreamState, data) -> None:
+        """스트림 데이터 전송 (압축 모드면 zlib으로 압축하고 flush_interval마다 동기화 flush)"""
+        if state.compressor is None:
+            self.write(writer, data)
+            return
+
+        started = time.perf_counter()
+        compressed = state.compressor.compress(data)
+        state.unflushed += len(data)
+        if state.unflushed >= state.flush_interval:
+            compressed += state.compressor.flush(zlib.Z_SYNC_FLUSH)
+            state.unflushed = 0
+        self.metric_compress_time.inc(time.perf_counter() - started)
+        self.metric_compress_in.inc(len(data))
+        self.metric_compress_out.inc(len(compressed))
+
+        state.wire_bytes += len(compressed)
+        if compressed:
+            self.write(writer, compressed)
 
-    def generate_random_byte(self):
-        """랜덤 바이트 생성"""
-        return random.choice([
-            random.randint(0x20, 0x7E),  # 출력 가능한 ASCII
-            random.randint(0x80, 0xFF),  # 확장 ASCII
-            random.choice([0x00, 0x0A, 0x0D, 0x09])  # 특수 문자
-        ])
+    def chunk_size(self, transport, bucket: TokenBucket, use_sendfile: bool) -> int:
+        """다음에 보낼 노이즈 크기
+
+        전송 버퍼를 high-water mark까지 채우는 만큼 보내되 스케줄러 quantum을 넘지
+        않고, 연결별 전송률 제한이 있으면 버스트 크기로 잘라 전송 간격을 고르게 유지한다.
+        """
+        size = self.EGRESS_QUANTUM
+        if not use_sendfile:
+            _, high = transport.get_write_buffer_limits()
+            size = min(size, max(self.MIN_CHUNK_SIZE, high - transport.get_write_buffer_size()))
+        if bucket.rate:
+            size = min(size, bucket.burst)
+        if self.egress.bucket.rate:
+            size = min(size, self.egress.bucket.burst)
+        return size
+
+    async def throttle(self, bucket: TokenBucket, size: int) -> None:
+        """연결별 토큰 버킷과 전송 스케줄러에서 size바이트를 보낼 차례를 받을 때까지 대기"""
+        if bucket.rate:
+            self.metric_throttle_wait.observe(await bucket.consume(size))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.metric_egress_queue.set(len(self.egress.waiting) + 1)
+        await self.egress.request(size)
+        self.metric_egress_wait.observe(loop.time() - started)
+
+    async def sendfile(self, writer, offset: int, count: int) -> None:
+        """코퍼스 파일의 구간을 sendfile로 전송
+
+        sendfile을 쓸 수 없는 전송 계층이면 이후로는 memoryview 전송으로 바꾼다.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.sendfile(writer.transport, self.corpus.file, offset, count, fallback=False)
+        except asyncio.SendfileNotAvailableError as e:
+            logging.warning(f"sendfile unavailable, falling back to memoryview writes: {e}")
+            self.use_sendfile = False
+            self.write(writer, self.corpus.view[offset:offset + count])
+            await self.drain(writer)
+            return
+        self.metric_bytes_sent.inc(count)
+
+    async def safe_write(self, writer, data: bytes) -> bool:
+        """연결이 살아 있으면 데이터를 보내고 성공 여부 반환"""
+        try:
+            if writer.transport and writer.transport.is_closing():
+                return False
+            self.write(writer, data)
+            await self.drain(writer)
+            return True
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            logging.debug(f"Write failed: {e}")
+            return False
+
+    def write(self, writer, data: bytes) -> None:
+        """데이터를 전송 버퍼에 넣고 전송 바이트 수 기록"""
+        writer.write(data)
+        self.metric_bytes_sent.inc(len(data))
+
+    async def drain(self, writer) -> None:
+        """전송 버퍼가 비워질 때까지 대기하며 대기 시간 기록"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await writer.drain()
+        self.metric_drain_wait.observe(loop.time() - started)
 
 
 if __name__ == '__main__':
+    setup_logging(LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
     server = ProblemServer(host='0.0.0.0', port=10500)
     asyncio.run(server.run())
\ No newline at end of file
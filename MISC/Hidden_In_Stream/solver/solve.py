@@ -7,12 +7,34 @@ import socket
 import re
 import sys
 import time
+import zlib
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def solve(host='localhost', port=10500):
+COMPRESS_REPLY = b"\nCOMPRESS OK zlib"
+
+
+def decompress_stream(received_data):
+    """Inflate everything after the 'COMPRESS OK' line of a COMPRESS session
+
+    The stream starts right away, so the server switches to zlib at the first
+    chunk boundary after our COMPRESS line arrives; bytes before the reply are plain.
+    """
+    reply_at = received_data.find(COMPRESS_REPLY)
+    if reply_at < 0:
+        logging.warning("Server did not accept COMPRESS, treating stream as plain")
+        return received_data
+
+    header_end = received_data.index(b"\n", reply_at + 1) + 1
+    # decompressobj tolerates a stream cut short by a timeout
+    decompressed = zlib.decompressobj().decompress(bytes(received_data[header_end:]))
+    logging.info(f"Decompressed {len(received_data) - header_end} bytes into {len(decompressed)} bytes")
+    return received_data[:header_end] + decompressed
+
+
+def solve(host='localhost', port=10500, compress=False, level=None):
     """Connect to server and find the hidden flag"""
 
     logging.info(f"Connecting to {host}:{port}")
@@ -25,8 +47,13 @@ def solve(host='localhost', port=10500):
 
         logging.info("Connected!")
 
+        # The option goes out as our first line; the stream does not wait for it
+        if compress:
+            option = f"COMPRESS {level}\n" if level is not None else "COMPRESS\n"
+            sock.sendall(option.encode())
+
         # Receive all data
-        received_data = b""
+        received_data = bytearray()
         chunk_size = 4096
 
         logging.info("Receiving data stream...")
@@ -45,7 +72,8 @@ def solve(host='localhost', port=10500):
                     logging.debug(f"Received {len(received_data)} bytes...")
 
                 # Check if we've received the completion message
-                if b"Stream complete!" in chunk:
+                # (compressed streams are read until the server closes)
+                if not compress and b"Stream complete!" in chunk:
                     break
 
             except socket.timeout:
@@ -55,6 +83,9 @@ def solve(host='localhost', port=10500):
         elapsed_time = time.time() - start_time
         logging.info(f"Received total of {len(received_data)} bytes in {elapsed_time:.2f} seconds")
 
+        if compress:
+            received_data = decompress_stream(received_data)
+
         # Search for flag pattern
         logging.info("Searching for flag...")
 
@@ -114,15 +145,27 @@ def solve(host='localhost', port=10500):
 
 def main():
     """Main function"""
-    if len(sys.argv) > 2:
-        host = sys.argv[1]
-        port = int(sys.argv[2])
+    # --compress[=LEVEL]: receive the stream as zlib (level 0-9, server default if omitted)
+    compress = False
+    level = None
+    args = []
+    for arg in sys.argv[1:]:
+        if arg == '--compress' or arg.startswith('--compress='):
+            compress = True
+            if '=' in arg:
+                level = int(arg.split('=', 1)[1])
+        else:
+            args.append(arg)
+
+    if len(args) > 1:
+        host = args[0]
+        port = int(args[1])
     else:
         host = 'localhost'
         port = 10500
 
     logging.info("=== Hidden In Stream Solver ===")
-    flag = solve(host, port)
+    flag = solve(host, port, compress, level)
 
     if flag:
         logging.info(f"SUCCESS!")
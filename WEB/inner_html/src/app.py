@@ -1,16 +1,83 @@
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver import Chrome
 
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, jsonify
 from urllib.parse import quote
+from collections import deque
+import threading
+import secrets
+import tempfile
+import shutil
+import queue
 import time
 import os
 
 app = Flask(__name__)
 app.secret_key = os.urandom(32)
 
-def read_url(url):
-    try:
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))  # 동시에 띄우는 브라우저 수
+BROWSER_MAX_VISITS = int(os.environ.get("BROWSER_MAX_VISITS", "20"))  # 이만큼 방문하면 브라우저 교체
+BROWSER_ACQUIRE_TIMEOUT = 30
+
+REPORT_WORKERS = BROWSER_POOL_SIZE  # 동시에 처리하는 report 수
+REPORT_QUEUE_SIZE = int(os.environ.get("REPORT_QUEUE_SIZE", "100"))  # 대기 중인 report 최대 수
+REPORT_MAX_PER_IP = int(os.environ.get("REPORT_MAX_PER_IP", "3"))  # IP당 대기 + 처리 중인 report 수
+REPORT_DEDUP_WINDOW = 60  # 이 시간(초) 안에 같은 URL이 다시 오면 기존 작업을 돌려줌
+REPORT_JOB_TTL = 600  # 끝난 작업의 상태를 보관하는 시간 (초)
+
+class BrowserPool:
+    """미리 띄워 둔 headless Chrome 풀
+
+    방문마다 새 브라우저 컨텍스트(시크릿 창처럼 쿠키/캐시/스토리지를 따로 가지는
+    공간)를 만들어 그 안에서만 탐색하고, 방문이 끝나면 컨텍스트째 없애므로 앞선
+    방문의 흔적이 남지 않는다. max_visits번 방문했거나 정리 중 오류가 나면(크래시
+    등) 종료하고 백그라운드에서 새로 띄운다. 풀에는 브라우저 또는 빈 자리(None)가
+    항상 size개만 있으므로 동시에 떠 있는 브라우저 수는 size를 넘지 않는다.
+    """
+
+    def __init__(self, size, max_visits):
+        self.size = size
+        self.max_visits = max_visits
+        self.idle = queue.Queue()
+        self.visits = {}
+        self.profiles = {}
+        self.homes = {}  # driver -> 기본 컨텍스트의 빈 탭
+        for _ in range(size):
+            self.idle.put(None)
+
+    def warm(self):
+        for _ in range(self.size):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _warm_one(self):
+        driver = self.idle.get()
+        if driver is None:
+            self._refill()
+        else:
+            self.idle.put(driver)
+
+    def visit(self, url):
+        driver = self.idle.get(timeout=BROWSER_ACQUIRE_TIMEOUT)
+        if driver is None:
+            try:
+                driver = self._launch()
+            except Exception:
+                self.idle.put(None)
+                raise
+
+        context = None
+        try:
+            context = self._open_context(driver)
+            driver.get("http://127.0.0.1:8080")
+
+            driver.get(url)
+            app.logger.info(f"URL : {url}")
+
+            time.sleep(2)
+        finally:
+            self._release(driver, context)
+
+    def _launch(self):
         options = Options()
 
         for _ in [
@@ -20,29 +87,174 @@ def read_url(url):
             "no-sandbox",
             "disable-dev-shm-usage"
         ]:
-            
+
             options.add_argument(_)
 
-        driver = Chrome(options=options)
+        profile = tempfile.mkdtemp(prefix="report-bot-")
+        options.add_argument(f"user-data-dir={profile}")
+        # 열린 alert가 다음 방문의 명령을 막지 않도록 자동으로 닫음
+        options.set_capability("unhandledPromptBehavior", "dismiss")
+
+        try:
+            driver = Chrome(options=options)
+        except Exception:
+            shutil.rmtree(profile, ignore_errors=True)
+            raise
         driver.implicitly_wait(5)
         driver.set_page_load_timeout(5)
 
-        driver.get("http://127.0.0.1:8080")
-        
-        driver.get(url)
-        app.logger.info(f"URL : {url}")
-        
-        time.sleep(2)
-        driver.quit()
-        
+        self.visits[driver] = 0
+        self.profiles[driver] = profile
+        self.homes[driver] = driver.current_window_handle
+        return driver
+
+    def _refill(self):
+        try:
+            driver = self._launch()
+        except Exception as e:
+            app.logger.info(f"browser launch error : {e}")
+            driver = None
+        self.idle.put(driver)
+
+    def _release(self, driver, context):
+        self.visits[driver] += 1
+        if context is not None and self.visits[driver] < self.max_visits:
+            try:
+                self._close_context(driver, context)
+                self.idle.put(driver)
+                return
+            except Exception as e:
+                app.logger.info(f"browser reset error : {e}")
+
+        self._quit(driver)
+        threading.Thread(target=self._refill, daemon=True).start()
+
+    def _open_context(self, driver):
+        context = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+        target = driver.execute_cdp_cmd(
+            "Target.createTarget", {"url": "about:blank", "browserContextId": context}
+        )["targetId"]
+        # ChromeDriver의 창 핸들은 CDP target id와 같음
+        driver.switch_to.window(target)
+        return context
+
+    def _close_context(self, driver, context):
+        # 컨텍스트를 없애면 방문 중에 열린 창/탭과 쿠키/캐시/스토리지도 함께 사라짐
+        driver.switch_to.window(self.homes[driver])
+        driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context})
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        del self.visits[driver]
+        del self.homes[driver]
+        shutil.rmtree(self.profiles.pop(driver), ignore_errors=True)
+
+browser_pool = BrowserPool(BROWSER_POOL_SIZE, BROWSER_MAX_VISITS)
+
+def read_url(url):
+    try:
+        browser_pool.visit(url)
         return True
     except Exception as e:
         app.logger.info(f"error : {e}")
         return False
 
-def request_report(msg):
+class ReportRejected(Exception):
+    pass
+
+class ReportQueue:
+    """메모리 기반 report 작업 큐
+
+    submit()은 작업 ID를 바로 돌려주고, 워커 스레드 workers개가 순서대로
+    read_url()을 실행한다. 상태는 queued -> running -> done/failed로 바뀐다.
+    """
+
+    def __init__(self, workers, max_queued, max_per_ip, dedup_window, job_ttl):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_per_ip = max_per_ip
+        self.dedup_window = dedup_window
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.pending = deque()
+        self.per_ip = {}
+        self.recent = {}  # url -> (작업 ID, 접수 시각)
+        self.cond = threading.Condition()
+        self.started = False
+
+    def submit(self, url, ip):
+        with self.cond:
+            now = time.time()
+            self._expire(now)
+
+            # 같은 URL이 최근에 접수됐으면 새로 방문하지 않음
+            recent = self.recent.get(url)
+            if recent and self.jobs.get(recent[0], {}).get("status") != "failed":
+                return recent[0]
+
+            if self.per_ip.get(ip, 0) >= self.max_per_ip:
+                raise ReportRejected("이미 처리 중인 요청이 많습니다. 잠시 후 다시 시도해주세요.")
+            if len(self.pending) >= self.max_queued:
+                raise ReportRejected("대기 중인 요청이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+
+            job_id = secrets.token_urlsafe(8)
+            self.jobs[job_id] = {"id": job_id, "status": "queued", "ip": ip, "url": url,
+                                 "created": now, "finished": None}
+            self.pending.append(job_id)
+            self.per_ip[ip] = self.per_ip.get(ip, 0) + 1
+            self.recent[url] = (job_id, now)
+
+            if not self.started:
+                self.started = True
+                for _ in range(self.workers):
+                    threading.Thread(target=self._work, daemon=True).start()
+            self.cond.notify()
+            return job_id
+
+    def status(self, job_id):
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            result = {"id": job_id, "status": job["status"]}
+            if job["status"] == "queued":
+                result["position"] = self.pending.index(job_id) + 1
+            return result
+
+    def _work(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                job = self.jobs[self.pending.popleft()]
+                job["status"] = "running"
+
+            ok = read_url(job["url"])
+
+            with self.cond:
+                job["status"] = "done" if ok else "failed"
+                job["finished"] = time.time()
+                self.per_ip[job["ip"]] -= 1
+                if self.per_ip[job["ip"]] <= 0:
+                    del self.per_ip[job["ip"]]
+
+    def _expire(self, now):
+        for url, (job_id, submitted) in list(self.recent.items()):
+            if now - submitted >= self.dedup_window:
+                del self.recent[url]
+        for job_id, job in list(self.jobs.items()):
+            if job["finished"] and now - job["finished"] >= self.job_ttl:
+                del self.jobs[job_id]
+
+report_queue = ReportQueue(REPORT_WORKERS, REPORT_QUEUE_SIZE, REPORT_MAX_PER_IP,
+                           REPORT_DEDUP_WINDOW, REPORT_JOB_TTL)
+
+def request_report(msg, ip):
     url = f"http://127.0.0.1:8080/msg?msg={quote(msg)}"
-    return read_url(url)
+    return report_queue.submit(url, ip)
 
 @app.route('/')
 def index():
@@ -55,11 +267,21 @@ def report():
 
     elif request.method == 'POST':
         url = request.form.get('url', '')
-        if request_report(url):
-            return render_template('report.html', msg='전달이 완료되었습니다!')
+        try:
+            job_id = request_report(url, request.remote_addr)
+        except ReportRejected as e:
+            return render_template('report.html', msg=str(e)), 429
+
+        return render_template('report.html', msg=f'접수되었습니다! 진행 상황: /report/{job_id}'), 202
+
+@app.route('/report/<job_id>', methods=["GET"])
+def report_status(job_id):
+    status = report_queue.status(job_id)
+    if status is None:
+        return jsonify({"error": "not found"}), 404
+
+    return jsonify(status)
 
-        return render_template('report.html', msg='실패했습니다. 입력 값을 다시 확인해주세요.')
-    
 @app.route('/mypage', methods=["GET"])
 def mypage():
     if request.remote_addr == '127.0.0.1':
@@ -74,4 +296,8 @@ def user():
 
     return render_template('msg.html', msg='/msg?msg=welcome')
 
+# debug 리로더의 감시 프로세스가 아닌 실제 서버 프로세스에서만 브라우저를 띄움
+if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    browser_pool.warm()
+
 app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+챌린지 서버 공용 모듈
+
+Binary Maze Runner, Pattern Lock Decoder, Hidden In Stream 서버가 함께 쓰는
+로깅 파이프라인, 메트릭 저장소, 입장 제어와 SO_REUSEPORT 워커 관리다. 각 서버의
+Dockerfile이 이 파일을 서버 옆에 ADD하고, 저장소에서 바로 실행할 때는 서버가
+common/ 디렉터리를 sys.path에 추가한다.
+"""
+
+import asyncio
+import atexit
+import bisect
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+# 로깅 설정 (LOG_LEVEL, LOG_FORMAT=text|json 환경 변수로 변경 가능)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄짜리 JSON 로그 포맷"""
+
+    def __init__(self, worker_id: Optional[int] = None):
+        super().__init__()
+        self.worker_id = worker_id
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        if self.worker_id is not None:
+            entry['worker'] = self.worker_id
+        for key in ('event', 'client_id'):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class EventSampler(logging.Filter):
+    """extra={'event': ...}가 붙은 로그를 이벤트 종류별로 샘플링/초당 제한"""
+
+    def __init__(self, sample_rates: dict, rate_limits: dict):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self.windows = {}  # event -> (초 단위 구간, 기록 수)
+        self.dropped = {}  # event -> 버려진 로그 수
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, 'event', None)
+        if event is None:
+            return True
+
+        rate = self.sample_rates.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.dropped[event] = self.dropped.get(event, 0) + 1
+            return False
+
+        limit = self.rate_limits.get(event)
+        if limit is not None:
+            second = int(time.monotonic())
+            window, count = self.windows.get(event, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= limit:
+                self.dropped[event] = self.dropped.get(event, 0) + 1
+                return False
+            self.windows[event] = (window, count + 1)
+
+        return True
+
+
+def setup_logging(sample_rates: dict, rate_limits: dict,
+                  worker_id: Optional[int] = None) -> logging.handlers.QueueListener:
+    """비동기 로깅 설정
+
+    이벤트 루프에서는 레코드를 큐에 넣기만 하고, 실제 출력은 QueueListener의
+    백그라운드 스레드가 처리하므로 로그 I/O가 이벤트 루프를 막지 않는다.
+    sample_rates/rate_limits는 EventSampler에 그대로 넘어간다. fork 이후에는
+    스레드가 복제되지 않으므로 각 프로세스에서 다시 호출해야 하며, worker_id를
+    주면 모든 로그에 워커 번호가 붙는다.
+    """
+    if os.environ.get('LOG_FORMAT', 'text') == 'json':
+        formatter = JsonFormatter(worker_id)
+    elif worker_id is not None:
+        formatter = logging.Formatter(LOG_FORMAT.replace('%(levelname)s', f'worker {worker_id} - %(levelname)s'))
+    else:
+        formatter = logging.Formatter(LOG_FORMAT)
+
+    output = logging.StreamHandler()
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(EventSampler(sample_rates, rate_limits))
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get('LOG_LEVEL', 'DEBUG').upper())
+    root.handlers = [queue_handler]
+
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class Metric:
+    """레이블별 값을 가지는 메트릭 (Prometheus 텍스트 포맷으로 출력)"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            # [버킷별 개수(마지막은 +Inf), 합계, 전체 개수]
+            state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = self._format_labels(key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """프로세스 내부 메트릭 저장소와 /metrics HTTP 엔드포인트
+
+    HTTP 서버는 챌린지 서버와 같은 이벤트 루프에서 동작한다.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, host: str, port: int):
+        """GET /metrics 요청에 Prometheus 텍스트 포맷으로 응답하는 HTTP 서버 시작"""
+        return await asyncio.start_server(self._handle_http, host=host, port=port)
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while True:
+                header = await asyncio.wait_for(reader.readline(), timeout=5)
+                if header in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode(errors='ignore').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.render().encode()
+            else:
+                status, body = '404 Not Found', b'not found\n'
+
+            writer.write(f"HTTP/1.1 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def monitor_event_loop_lag(lag: Histogram, interval: float = 0.25) -> None:
+    """sleep(interval)이 늦게 깨어난 만큼을 이벤트 루프 지연으로 기록"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag.observe(max(0.0, loop.time() - start - interval))
+
+
+class AdmissionRejected(Exception):
+    """입장 거절 (reason은 메트릭 레이블로 사용)"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class AdmissionController:
+    """세션이 끝날 때까지 접속 자리를 잡아 두는 입장 제어
+
+    - 자리가 없으면 최대 max_waiting명까지 FIFO 대기열에 세우고 순번을 알려 준다
+    - 같은 IP는 접속 중 + 대기 중을 합쳐 max_per_ip개까지만 허용한다 (프로세스별)
+    slots는 try_acquire()/release()/in_use를 가진 접속 자리 카운터다. 여러 프로세스가
+    나눠 쓰는 카운터라면 다른 프로세스가 반납한 자리는 알림이 오지 않으므로 대기열
+    선두가 poll_interval마다 다시 시도한다.
+    """
+
+    def __init__(self, slots, max_waiting: int, max_per_ip: int,
+                 poll_interval: float = 0.5):
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self.max_per_ip = max_per_ip
+        self.poll_interval = poll_interval
+        self.waiting = deque()  # 대기자별 asyncio.Event
+        self.per_ip = defaultdict(int)
+
+    async def acquire(self, ip: str, on_wait: Callable[[int], Awaitable[bool]], timeout: float) -> None:
+        """자리를 얻을 때까지 대기, 실패하면 AdmissionRejected
+
+        on_wait(position)은 대기 순번이 바뀔 때마다 호출되며, False를 반환하면
+        (클라이언트 연결 끊김) 대기를 포기한다.
+        """
+        if self.per_ip[ip] >= self.max_per_ip:
+            raise AdmissionRejected('per_ip', "Too many connections from your address")
+
+        # 대기자가 없을 때만 바로 입장 (새치기 방지)
+        if not self.waiting and self.slots.try_acquire():
+            self.per_ip[ip] += 1
+            return
+
+        if len(self.waiting) >= self.max_waiting:
+            raise AdmissionRejected('full', "Server is full")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        ticket = asyncio.Event()
+        self.waiting.append(ticket)
+        self.per_ip[ip] += 1
+        last_position = None
+
+        try:
+            while True:
+                position = self.waiting.index(ticket) + 1
+                if position == 1 and self.slots.try_acquire():
+                    self.waiting.popleft()
+                    self._wake_waiters()
+                    return
+
+                if position != last_position:
+                    if not await on_wait(position):
+                        raise AdmissionRejected('gone', "Client left the queue")
+                    last_position = position
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise AdmissionRejected('timeout', "Timed out waiting for a free slot")
+
+                ticket.clear()
+                try:
+                    await asyncio.wait_for(ticket.wait(), timeout=min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if ticket in self.waiting:
+                self.waiting.remove(ticket)
+                self._wake_waiters()
+            self._forget(ip)
+            raise
+
+    def release(self, ip: str) -> None:
+        """세션 종료 시 자리 반납"""
+        self.slots.release()
+        self._forget(ip)
+        self._wake_waiters()
+
+    def _forget(self, ip: str) -> None:
+        self.per_ip[ip] -= 1
+        if self.per_ip[ip] <= 0:
+            del self.per_ip[ip]
+
+    def _wake_waiters(self) -> None:
+        # 순번이 바뀌었을 수 있으므로 모두 깨운다 (max_waiting명 이하)
+        for ticket in self.waiting:
+            ticket.set()
+
+
+class ConnectionSlots:
+    """워커 프로세스들이 공유하는 동시 접속 수 카운터
+
+    워커별 접속 수를 공유 메모리(multiprocessing.Array)에 따로 센다. fork 전에
+    만들어 두면 모든 워커가 합계로 같은 MAX_CONNECTIONS 제한을 따르고, 죽은
+    워커가 잡고 있던 자리는 감독 프로세스가 reset()으로 되돌릴 수 있다.
+    """
+
+    def __init__(self, limit: int, workers: int = 1):
+        self.limit = limit
+        self.worker_id = 0
+        self._counts = multiprocessing.Array('i', workers)
+
+    def bind(self, worker_id: int) -> None:
+        """fork된 워커에서 호출: 이 프로세스의 접속을 셀 칸 지정"""
+        self.worker_id = worker_id
+
+    @property
+    def in_use(self) -> int:
+        with self._counts.get_lock():
+            return sum(self._counts[:])
+
+    def try_acquire(self) -> bool:
+        """빈 자리가 있으면 하나 차지하고 True 반환"""
+        with self._counts.get_lock():
+            if sum(self._counts[:]) >= self.limit:
+                return False
+            self._counts[self.worker_id] += 1
+            return True
+
+    def release(self) -> None:
+        with self._counts.get_lock():
+            self._counts[self.worker_id] -= 1
+
+    def reset(self, worker_id: int) -> None:
+        """죽은 워커가 잡고 있던 자리를 모두 반납"""
+        with self._counts.get_lock():
+            self._counts[worker_id] = 0
+
+
+WORKER_RESPAWN_DELAY = 1.0  # 죽은 워커를 다시 띄우기 전 대기 시간 (연속 크래시 방지)
+
+
+def run_workers(make_server: Callable[[ConnectionSlots, int], Any], max_connections: int, workers: int,
+                sample_rates: dict, rate_limits: dict) -> None:
+    """SO_REUSEPORT로 같은 포트를 공유하는 워커 프로세스 workers개를 fork하고 감시
+
+    make_server(connection_slots, worker_id)는 run() 코루틴을 가진 서버를 만든다.
+    워커마다 프로세스 그룹을 따로 만들어 프로세스 풀 자식까지 한 그룹으로 묶는다.
+    워커가 죽으면 그 워커가 잡고 있던 접속 자리를 되돌리고 그룹에 남은 프로세스를
+    정리한 뒤 다시 띄운다. SIGTERM/SIGINT는 모든 워커에 전달하고 종료를 기다린다.
+    """
+    connection_slots = ConnectionSlots(max_connections, workers)
+    children = {}  # pid -> worker_id
+    stopping = False
+    listener = None
+
+    def spawn(worker_id: int) -> None:
+        # 로깅 스레드가 핸들러 락을 잡은 채로 복제되지 않도록 fork 동안 멈춤
+        if listener is not None:
+            listener.stop()
+        pid = os.fork()
+        if pid == 0:
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            worker_listener = setup_logging(sample_rates, rate_limits, worker_id)
+            connection_slots.bind(worker_id)
+            code = 0
+            try:
+                asyncio.run(make_server(connection_slots, worker_id).run())
+            except Exception:
+                logging.exception(f"Worker {worker_id} crashed")
+                code = 1
+            finally:
+                # os._exit는 atexit을 건너뛰므로 큐에 남은 로그를 여기서 내보냄
+                worker_listener.stop()
+                os._exit(code)
+        if listener is not None:
+            listener.start()
+        children[pid] = worker_id
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    listener = setup_logging(sample_rates, rate_limits)
+    logging.info(f"Started {workers} workers: {list(children)}")
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = children.pop(pid, None)
+        if worker_id is None:
+            continue
+
+        # 워커가 정리하지 못하고 남긴 프로세스 풀 자식 정리
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        connection_slots.reset(worker_id)
+
+        if stopping:
+            continue
+        logging.warning(f"Worker {worker_id} (pid {pid}) exited with code "
+                        f"{os.waitstatus_to_exitcode(status)}, respawning")
+        time.sleep(WORKER_RESPAWN_DELAY)
+        if not stopping:
+            spawn(worker_id)
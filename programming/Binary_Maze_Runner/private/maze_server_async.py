@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
+import bisect
+import functools
+import os
 import random
 import logging
-from typing import List, Tuple, Optional
+import signal
+import struct
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, Tuple
 from enum import Enum
 
-# 로깅 설정
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+import numpy as np
+
+# 공용 모듈: 컨테이너에서는 이 파일 옆에 ADD되고, 저장소에서는 common/ 아래에 있음
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'common'))
+from server_common import (AdmissionController, AdmissionRejected, ConnectionSlots,  # noqa: E402
+                           MetricsRegistry, monitor_event_loop_lag, run_workers, setup_logging)
+
+# 이벤트 종류별 샘플링 비율 (0~1)과 초당 최대 기록 수
+LOG_SAMPLE_RATES = {'modification': 1.0, 'query': 1.0}
+LOG_RATE_LIMITS = {'modification': 50, 'query': 200}
 
 
 class QueryType(Enum):
@@ -15,6 +34,13 @@ class QueryType(Enum):
     FIND_FIRST = 'first'
 
 
+class Modification(Enum):
+    """배열 수정 이벤트 종류 (값은 v2 바이너리 레코드의 op 코드)"""
+    INSERT = 1
+    REMOVE = 2
+    MODIFY = 3
+
+
 class RoomConfig:
     """각 방 레벨의 설정"""
 
@@ -26,6 +52,430 @@ class RoomConfig:
         self.modification_interval = modification_interval
 
 
+class SortedArrayView:
+    """버킷 분할 정렬 배열의 읽기 전용 뷰
+
+    인덱스 접근과 bisect는 버킷 시작 오프셋에 대한 이진 탐색으로 O(log n)에
+    처리된다. SortedArray.snapshot()이 반환하는 스냅샷도 이 클래스이며,
+    원본 배열이 이후에 수정되어도 내용과 version이 바뀌지 않는다.
+    """
+
+    def __init__(self, lists: List[List[int]], maxes: List[int], length: int,
+                 version: int = 0, offsets: Optional[List[int]] = None):
+        self._lists = lists
+        self._maxes = maxes
+        self._len = length
+        self._offsets = offsets
+        self.version = version
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._lists:
+            yield from bucket
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SortedArray index out of range")
+
+        pos, idx = self._locate(index)
+        return self._lists[pos][idx]
+
+    def _build_offsets(self) -> List[int]:
+        """각 버킷의 시작 인덱스 목록 (변경 후 처음 접근할 때 재계산)"""
+        if self._offsets is None:
+            offsets = []
+            total = 0
+            for bucket in self._lists:
+                offsets.append(total)
+                total += len(bucket)
+            self._offsets = offsets
+        return self._offsets
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """전체 인덱스를 (버킷 번호, 버킷 내 인덱스)로 변환"""
+        offsets = self._build_offsets()
+        pos = bisect.bisect_right(offsets, index) - 1
+        return pos, index - offsets[pos]
+
+    def bisect_left(self, value: int) -> int:
+        """정렬 순서를 유지하며 value를 삽입할 가장 왼쪽 위치"""
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._build_offsets()[pos] + bisect.bisect_left(self._lists[pos], value)
+
+    def index(self, value: int) -> int:
+        """value가 처음 나타나는 인덱스 (없으면 ValueError)"""
+        index = self.bisect_left(value)
+        if index == self._len or self[index] != value:
+            raise ValueError(f"{value} is not in SortedArray")
+        return index
+
+
+class SortedArray(SortedArrayView):
+    """버킷 분할 정렬 배열 (copy-on-write 스냅샷 지원)
+
+    값을 최대 2 * load 크기의 정렬된 버킷들로 나누어 저장한다.
+    삽입/삭제는 하나의 버킷만 수정하므로 O(√n)이다.
+
+    snapshot()은 버킷을 복사하지 않고 O(1)에 불변 뷰를 만든다. 스냅샷과
+    공유 중인 버킷은 다음 수정 시점에 해당 버킷만 복사된다 (copy-on-write).
+    수정될 때마다 version이 1씩 증가하며, history > 0이면 최근 history개
+    버전의 스냅샷을 보관해 snapshots_since()로 조회할 수 있다.
+    """
+    DEFAULT_LOAD = 512
+
+    def __init__(self, iterable=(), load: int = DEFAULT_LOAD, history: int = 0):
+        values = sorted(iterable)
+        lists = [values[i:i + load] for i in range(0, len(values), load)]
+        super().__init__(lists, [bucket[-1] for bucket in lists], len(values))
+        self._load = load
+
+        # copy-on-write 상태: 세대가 현재와 다른 버킷은 스냅샷과 공유 중
+        self._generation = 0
+        self._bucket_generations = [0] * len(lists)
+        self._shared = False
+        self._snapshot = None
+
+        self._history = deque(maxlen=history) if history > 0 else None
+        if self._history is not None:
+            self._history.append(self.snapshot())
+
+    def snapshot(self) -> SortedArrayView:
+        """현재 상태의 불변 스냅샷 (O(1), 같은 버전이면 재사용)"""
+        if self._snapshot is None:
+            self._snapshot = SortedArrayView(self._lists, self._maxes, self._len,
+                                             self.version, self._offsets)
+            self._shared = True
+            self._generation += 1
+        return self._snapshot
+
+    def snapshots_since(self, version: int) -> List[SortedArrayView]:
+        """version 이후 보관 중인 스냅샷들 (마지막 원소는 항상 현재 상태)"""
+        states = []
+        if self._history is not None:
+            states = [state for state in self._history if version <= state.version < self.version]
+        states.append(self.snapshot())
+        return states
+
+    def _begin_write(self) -> None:
+        """수정 전에 스냅샷과 공유 중인 버킷 목록을 분리"""
+        if self._shared:
+            self._lists = list(self._lists)
+            self._maxes = list(self._maxes)
+            self._shared = False
+
+    def _writable_bucket(self, pos: int) -> List[int]:
+        """pos 번째 버킷을 수정 가능한 상태로 반환 (공유 중이면 복사)"""
+        if self._bucket_generations[pos] != self._generation:
+            self._lists[pos] = list(self._lists[pos])
+            self._bucket_generations[pos] = self._generation
+        return self._lists[pos]
+
+    def _replace_buckets(self, start: int, stop: int, buckets: List[List[int]]) -> None:
+        """[start, stop) 범위의 버킷을 새 버킷들로 교체"""
+        self._lists[start:stop] = buckets
+        self._maxes[start:stop] = [bucket[-1] for bucket in buckets]
+        self._bucket_generations[start:stop] = [self._generation] * len(buckets)
+
+    def _end_write(self) -> None:
+        """수정 완료 후 버전 증가 및 히스토리 기록"""
+        self._offsets = None
+        self._snapshot = None
+        self.version += 1
+        if self._history is not None:
+            self._history.append(self.snapshot())
+
+    def insert(self, value: int) -> int:
+        """정렬 순서를 유지하며 value를 삽입하고 삽입된 인덱스를 반환"""
+        self._begin_write()
+
+        if not self._lists:
+            self._replace_buckets(0, 0, [[value]])
+            self._len = 1
+            self._end_write()
+            return 0
+
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+
+        bucket = self._writable_bucket(pos)
+        idx = bisect.bisect_left(bucket, value)
+        index = self._build_offsets()[pos] + idx
+
+        bucket.insert(idx, value)
+        self._maxes[pos] = bucket[-1]
+        self._len += 1
+
+        # 버킷이 너무 커지면 반으로 분할
+        if len(bucket) > 2 * self._load:
+            half = len(bucket) // 2
+            self._replace_buckets(pos, pos + 1, [bucket[:half], bucket[half:]])
+
+        self._end_write()
+        return index
+
+    def pop(self, index: int = -1) -> int:
+        """index 위치의 값을 제거하고 반환"""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SortedArray pop index out of range")
+
+        self._begin_write()
+        pos, idx = self._locate(index)
+        bucket = self._writable_bucket(pos)
+        value = bucket.pop(idx)
+        self._len -= 1
+
+        if not bucket:
+            self._replace_buckets(pos, pos + 1, [])
+        else:
+            self._maxes[pos] = bucket[-1]
+            # 너무 작아진 버킷은 이웃과 병합
+            if len(bucket) < self._load // 4 and len(self._lists) > 1:
+                if pos == len(self._lists) - 1:
+                    pos -= 1
+                merged = self._lists[pos] + self._lists[pos + 1]
+                if len(merged) > 2 * self._load:
+                    half = len(merged) // 2
+                    self._replace_buckets(pos, pos + 2, [merged[:half], merged[half:]])
+                else:
+                    self._replace_buckets(pos, pos + 2, [merged])
+
+        self._end_write()
+        return value
+
+
+class TextWireFormat:
+    """기본 텍스트 프로토콜 (v1)"""
+    version = 1
+
+    def describe(self) -> str:
+        return "text"
+
+    def encode_array(self, arr: List[int]) -> bytes:
+        return f"Array (size={len(arr)}): {arr}\n\n".encode()
+
+    @staticmethod
+    def format_modification(op: Modification, index: int, value: int,
+                            new_value: int = 0, new_index: int = 0) -> str:
+        if op == Modification.INSERT:
+            return f"🔄 ARRAY MODIFIED: INSERT at index {index} value {value}\n"
+        if op == Modification.REMOVE:
+            return f"🔄 ARRAY MODIFIED: REMOVE at index {index} (was {value})\n"
+        return f"🔄 ARRAY MODIFIED: MODIFY at index {index} from {value} to {new_value} (now at index {new_index})\n"
+
+    def encode_modification(self, op: Modification, index: int, value: int,
+                            new_value: int = 0, new_index: int = 0) -> bytes:
+        return self.format_modification(op, index, value, new_value, new_index).encode()
+
+
+class BinaryWireFormat:
+    """바이너리 프로토콜 (v2)
+
+    텍스트 줄 사이에 NUL(0x00)로 시작하는 바이너리 프레임이 끼어 들어간다.
+
+    배열 프레임:  b"\\x00A" + >I(payload 길이) + payload
+                  payload = >BI(인코딩, 원소 수) + 데이터
+                  인코딩 1 = big-endian int32, 2 = 차분 varint (LEB128),
+                  0x80 비트가 켜져 있으면 데이터 부분이 zlib 압축됨
+    수정 레코드:  b"\\x00M" + >BIIII(op, index, value, new_value, new_index) - 고정 19바이트
+    """
+    version = 2
+
+    INT32 = 1
+    VARINT = 2
+    ZLIB = 0x80
+
+    ARRAY_HEADER = struct.Struct(">BI")
+    MODIFICATION_RECORD = struct.Struct(">BIIII")
+
+    def __init__(self, encoding: int = VARINT, compress: bool = False):
+        self.encoding = encoding
+        self.compress = compress
+
+    def describe(self) -> str:
+        name = "varint" if self.encoding == self.VARINT else "int32"
+        return f"{name} zlib" if self.compress else name
+
+    @staticmethod
+    def encode_varint_deltas(arr: List[int]) -> bytes:
+        """정렬 배열을 차분 후 LEB128 varint로 인코딩 (NumPy 벡터 연산)"""
+        deltas = np.diff(np.asarray(arr, dtype=np.int64), prepend=0).astype(np.uint64)
+        lengths = np.ones(len(deltas), dtype=np.int64)
+        for shift in (7, 14, 21, 28):
+            lengths += deltas >= (1 << shift)
+
+        out = np.zeros(int(lengths.sum()), dtype=np.uint8)
+        starts = np.cumsum(lengths) - lengths
+        for k in range(5):
+            selected = lengths > k
+            if not selected.any():
+                break
+            chunk = (deltas[selected] >> np.uint64(7 * k)) & np.uint64(0x7F)
+            more = (lengths[selected] > k + 1).astype(np.uint64) << np.uint64(7)
+            out[starts[selected] + k] = chunk | more
+        return out.tobytes()
+
+    def encode_array(self, arr: List[int]) -> bytes:
+        if self.encoding == self.VARINT:
+            data = self.encode_varint_deltas(arr)
+        else:
+            data = np.asarray(arr, dtype=">i4").tobytes()
+
+        flags = self.encoding
+        if self.compress:
+            data = zlib.compress(data)
+            flags |= self.ZLIB
+
+        payload = self.ARRAY_HEADER.pack(flags, len(arr)) + data
+        return b"\x00A" + struct.pack(">I", len(payload)) + payload
+
+    def encode_modification(self, op: Modification, index: int, value: int,
+                            new_value: int = 0, new_index: int = 0) -> bytes:
+        return b"\x00M" + self.MODIFICATION_RECORD.pack(op.value, index, value, new_value, new_index)
+
+
+class SessionOptions:
+    """접속 직후 클라이언트와 협상한 세션 옵션"""
+
+    def __init__(self):
+        self.wire = TextWireFormat()
+        self.batch_size = 1  # 한 번에 보내는 쿼리 수 (1 = 순차 모드)
+        self.accept_options = True  # 세션의 첫 줄은 옵션 명령일 수 있음
+
+
+class OptionCommand(Exception):
+    """세션의 첫 줄로 옵션 명령이 들어옴 (협상 후 방을 다시 시작)"""
+
+    def __init__(self, line: str):
+        super().__init__(line)
+        self.line = line
+
+
+def seed_worker() -> None:
+    """포크된 워커 프로세스의 난수 상태 재설정 (부모와 같은 방이 생성되지 않도록)"""
+    random.seed()
+
+
+class RoomPool:
+    """레벨별로 미리 생성해 둔 방 풀
+
+    방 생성은 executor(프로세스 풀)에서 실행되고, 풀에 남은 방이 size개보다
+    적어지면 백그라운드로 다시 채운다. 접속 시에는 완성된 방을 꺼내기만
+    하므로 O(1)이며, 풀이 비어 있을 때만 생성 완료를 기다린다.
+
+    생성이 실패하면 점점 늘어나는 간격을 두고 다시 채우고, 프로세스 풀이
+    깨지면(BrokenProcessPool) executor_factory로 새 풀을 만들어 교체한다.
+    """
+
+    RETRY_DELAY = 0.5  # 생성 실패 후 다시 채우기까지의 첫 대기 시간 (실패가 이어지면 두 배씩)
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(self, factory, levels, size: int, executor_factory: Callable[[], Executor]):
+        self._factory = factory
+        self._executor_factory = executor_factory
+        self._executor = executor_factory()
+        self._size = size
+        self._rooms = {level: deque() for level in levels}
+        self._pending = {level: 0 for level in levels}
+        self._failures = {level: 0 for level in levels}  # 연속 실패 횟수 (대기 시간 계산용)
+        self._retries = {level: None for level in levels}  # 예약된 다시 채우기 (TimerHandle)
+        self._closed = False
+
+    def start(self) -> None:
+        """모든 레벨의 풀 채우기 시작"""
+        for level in self._rooms:
+            self._refill(level)
+
+    def shutdown(self) -> None:
+        """예약된 다시 채우기를 취소하고 프로세스 풀 종료"""
+        self._closed = True
+        for handle in self._retries.values():
+            if handle:
+                handle.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _refill(self, level: int) -> None:
+        # 실패 후 대기 중이면 예약된 시점에 채운다
+        if self._closed or self._retries[level]:
+            return
+        loop = asyncio.get_running_loop()
+        while len(self._rooms[level]) + self._pending[level] < self._size:
+            executor = self._executor
+            try:
+                future = loop.run_in_executor(executor, self._factory, level)
+            except BrokenProcessPool:
+                self._replace_executor(executor)
+                continue
+            self._pending[level] += 1
+            future.add_done_callback(functools.partial(self._on_built, level, executor))
+
+    def _on_built(self, level: int, executor: Executor, future: asyncio.Future) -> None:
+        self._pending[level] -= 1
+        if future.cancelled() or self._closed:
+            return
+        try:
+            room = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._replace_executor(executor)
+            self._schedule_retry(level, e)
+            return
+        self._failures[level] = 0
+        self._rooms[level].append(room)
+
+    def _schedule_retry(self, level: int, error: Exception) -> None:
+        """생성 실패 후 대기 시간을 두고 다시 채우기 예약 (레벨마다 하나만)"""
+        if self._retries[level]:
+            return
+        self._failures[level] += 1
+        delay = min(self.RETRY_DELAY * 2 ** (self._failures[level] - 1), self.MAX_RETRY_DELAY)
+        logging.error(f"Room {level} generation failed: {error!r}, refilling in {delay:.1f}s")
+        self._retries[level] = asyncio.get_running_loop().call_later(delay, self._retry, level)
+
+    def _retry(self, level: int) -> None:
+        self._retries[level] = None
+        self._refill(level)
+
+    def _replace_executor(self, broken: Executor) -> None:
+        """깨진 프로세스 풀을 새 풀로 교체 (이미 교체했으면 무시)"""
+        if broken is not self._executor or self._closed:
+            return
+        logging.warning("Room generator process pool is broken, starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._executor_factory()
+
+    async def take(self, level: int) -> Tuple[List[int], List[Tuple[int, QueryType]]]:
+        """미리 생성된 방 하나를 꺼냄 (없으면 새로 생성될 때까지 대기)"""
+        rooms = self._rooms[level]
+        if rooms:
+            room = rooms.popleft()
+        else:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                room = await loop.run_in_executor(executor, self._factory, level)
+            except BrokenProcessPool:
+                # 프로세스 풀이 깨졌으면 새 풀에서 한 번 더 생성
+                self._replace_executor(executor)
+                room = await loop.run_in_executor(self._executor, self._factory, level)
+        self._refill(level)
+        return room
+
+
 class ProblemServer:
     FLAG = "KCTF_Jr{binary_search_speedrunner_2025}"
 
@@ -35,6 +485,18 @@ class ProblemServer:
     MAX_ARRAY_VALUE = 2000
     CONNECTION_TIMEOUT = 240  # 4분
     MAX_CONNECTIONS = 50
+    MAX_WAITING = 50  # 자리가 날 때까지 대기열에 세울 최대 인원
+    MAX_CONNECTIONS_PER_IP = 10  # IP당 접속 + 대기 최대 수
+    ADMISSION_TIMEOUT = 60  # 대기열에서 기다릴 수 있는 최대 시간 (초)
+    SNAPSHOT_HISTORY = 32  # 채점 시 확인할 최근 배열 버전 수
+    ROOM_POOL_SIZE = 16  # 레벨별로 미리 생성해 둘 방 개수
+    ROOM_POOL_WORKERS = 2  # 방 생성 프로세스 수
+    OPTION_COMMANDS = ('PROTO', 'BATCH', 'START')  # 세션 첫 줄로 받으면 협상을 시작하는 명령
+    MAX_BATCH_SIZE = 25  # 배치 모드에서 한 번에 보낼 수 있는 최대 쿼리 수
+
+    # 메트릭 HTTP 엔드포인트 (METRICS_PORT=0이면 비활성화)
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', '9437'))
 
     # 방 설정
     ROOM_CONFIGS = {
@@ -43,41 +505,117 @@ class ProblemServer:
         3: RoomConfig((1000, 10000), (1, 100000), 100, 5.0)
     }
 
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, connection_slots: Optional[ConnectionSlots] = None,
+                 worker_id: Optional[int] = None):
         self.host = host
         self.port = port
+        self.worker_id = worker_id
+        self.connection_slots = connection_slots or ConnectionSlots(self.MAX_CONNECTIONS)
         self.active_connections = 0
         self.total_connections = 0
-        self.connection_semaphore = asyncio.Semaphore(self.MAX_CONNECTIONS)
+        self.admission = AdmissionController(self.connection_slots, self.MAX_WAITING, self.MAX_CONNECTIONS_PER_IP)
+        self.room_pool = None
+        self.lag_monitor = None
+
+        # 메트릭
+        self.metrics = MetricsRegistry()
+        self.metric_active = self.metrics.gauge('maze_active_connections', 'Currently connected clients')
+        self.metric_global_active = self.metrics.gauge(
+            'maze_global_active_connections', 'Connected clients across all worker processes')
+        self.metric_rejected = self.metrics.counter(
+            'maze_rejected_connections_total', 'Connections refused by admission control', ('reason',))
+        self.metric_waiting = self.metrics.gauge('maze_admission_queue_length', 'Clients waiting for a free slot')
+        self.metric_admission_wait = self.metrics.histogram(
+            'maze_admission_wait_seconds', 'Time from connect to being admitted')
+        self.metric_connections = self.metrics.counter('maze_connections_total', 'Accepted connections')
+        self.metric_bytes_sent = self.metrics.counter('maze_bytes_sent_total', 'Bytes written to clients')
+        self.metric_drain_wait = self.metrics.histogram('maze_drain_wait_seconds', 'Time spent in writer.drain()')
+        self.metric_query_latency = self.metrics.histogram(
+            'maze_query_latency_seconds', 'Time from sending a query to reading its answer', ('room',))
+        self.metric_query_results = self.metrics.counter(
+            'maze_query_results_total', 'Graded answers by outcome', ('room', 'result'))
+        self.metric_room_results = self.metrics.counter(
+            'maze_room_results_total', 'Finished rooms by outcome', ('room', 'result'))
+        self.metric_loop_lag = self.metrics.histogram('maze_event_loop_lag_seconds', 'Event loop wake-up delay')
 
     async def run(self):
-        server = await asyncio.start_server(self.on_connect, host=self.host, port=self.port)
-        logging.info(f"Binary Maze Runner server started on {self.host}:{self.port}")
-        logging.info(f"Maximum concurrent connections: {self.MAX_CONNECTIONS}")
-        await server.wait_closed()
+        executor_factory = functools.partial(ProcessPoolExecutor, max_workers=self.ROOM_POOL_WORKERS,
+                                             initializer=seed_worker)
+        self.room_pool = RoomPool(self.generate_room, self.ROOM_CONFIGS, self.ROOM_POOL_SIZE, executor_factory)
+        try:
+            self.room_pool.start()
+
+            if self.METRICS_PORT:
+                # 워커마다 METRICS_PORT + worker_id 포트 사용
+                metrics_port = self.METRICS_PORT + (self.worker_id or 0)
+                await self.metrics.serve(self.METRICS_HOST, metrics_port)
+                self.lag_monitor = asyncio.create_task(monitor_event_loop_lag(self.metric_loop_lag))
+                logging.info(f"Metrics available at http://{self.METRICS_HOST}:{metrics_port}/metrics")
+
+            # 워커 모드에서는 SO_REUSEPORT로 모든 워커가 같은 포트를 공유
+            server = await asyncio.start_server(self.on_connect, host=self.host, port=self.port,
+                                                reuse_port=self.worker_id is not None)
+            logging.info(f"Binary Maze Runner server started on {self.host}:{self.port}")
+            logging.info(f"Maximum concurrent connections: {self.MAX_CONNECTIONS}")
+
+            # SIGTERM/SIGINT를 받으면 접속을 그만 받고 프로세스 풀까지 정리한 뒤 종료
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, stop.set)
+            await stop.wait()
+            logging.info("Shutting down")
+            server.close()
+        finally:
+            self.room_pool.shutdown()
 
     async def on_connect(self, reader, writer):
         peername = writer.get_extra_info('peername')
+        ip = peername[0] if peername else 'unknown'
+        loop = asyncio.get_running_loop()
+        connected_at = loop.time()
 
-        async with self.connection_semaphore:
-            self.active_connections += 1
-            self.total_connections += 1
-            client_id = self.total_connections
+        async def notify_position(position: int) -> bool:
+            self.metric_waiting.set(len(self.admission.waiting))
+            message = f"⏳ Server busy, you are in queue position {position}. Please wait...\n"
+            return await self.safe_write(writer, message.encode(), 0)
 
-            logging.info(f"Client {client_id} connected: {peername}")
-            logging.info(f"Active connections: {self.active_connections}")
+        # 세션이 끝날 때까지 자리를 잡아 둔다
+        try:
+            await self.admission.acquire(ip, notify_position, self.ADMISSION_TIMEOUT)
+        except AdmissionRejected as e:
+            self.metric_rejected.inc(reason=e.reason)
+            self.metric_waiting.set(len(self.admission.waiting))
+            logging.warning(f"Connection from {peername} rejected: {e} "
+                            f"({self.connection_slots.in_use}/{self.MAX_CONNECTIONS} in use, "
+                            f"{len(self.admission.waiting)} waiting)")
+            await self.safe_write(writer, f"❌ {e}, please try again later.\n".encode(), 0)
+            writer.close()
+            return
 
-            def cleanup(fu):
-                try:
-                    fu.result()
-                except Exception as e:
-                    logging.error(f"Exception in client {client_id} connection: {e}")
+        self.metric_admission_wait.observe(loop.time() - connected_at)
+        self.metric_waiting.set(len(self.admission.waiting))
+        self.metric_global_active.set(self.connection_slots.in_use)
 
-                self.active_connections -= 1
-                logging.info(f"Client {client_id} disconnected. Active connections: {self.active_connections}")
+        self.active_connections += 1
+        self.total_connections += 1
+        client_id = self.total_connections
+        self.metric_active.inc()
+        self.metric_connections.inc()
 
-            task = asyncio.create_task(self.handle_client(reader, writer, client_id))
-            task.add_done_callback(cleanup)
+        logging.info(f"Client {client_id} connected: {peername}")
+        logging.info(f"Active connections: {self.active_connections}")
+
+        try:
+            await self.handle_client(reader, writer, client_id)
+        except Exception as e:
+            logging.error(f"Exception in client {client_id} connection: {e}")
+        finally:
+            self.active_connections -= 1
+            self.admission.release(ip)
+            self.metric_active.dec()
+            self.metric_global_active.set(self.connection_slots.in_use)
+            logging.info(f"Client {client_id} disconnected. Active connections: {self.active_connections}")
 
     async def handle_client(self, reader, writer, client_id):
         try:
@@ -107,16 +645,22 @@ Complete 3 rooms to escape with the flag!
             logging.info(f"Client {client_id} failed to send welcome message")
             return
 
-        await asyncio.sleep(0.1)
+        options = SessionOptions()
 
-        # 3개의 방 모두 처리
-        for room in range(1, 4):
-            success = await self.handle_room(reader, writer, room, client_id)
+        # 3개의 방 모두 처리 (첫 줄이 옵션 명령이면 협상 후 그 방을 다시 시작)
+        room = 1
+        while room <= 3:
+            try:
+                success = await self.handle_room(reader, writer, room, client_id, options)
+            except OptionCommand as e:
+                options = await self.negotiate(reader, writer, client_id, e.line)
+                continue
             if not success:
                 logging.info(f"Client {client_id} failed at room {room}")
                 writer.close()
                 await writer.wait_closed()
                 return
+            room += 1
 
         # 모든 방 클리어 - 플래그 전송
         logging.info(f"Client {client_id} all rooms completed! Sending flag: {self.FLAG[:15]}...{self.FLAG[-5:]}")
@@ -128,7 +672,56 @@ Complete 3 rooms to escape with the flag!
         writer.close()
         await writer.wait_closed()
 
-    async def handle_room(self, reader, writer, room: int, client_id: int) -> bool:
+    async def negotiate(self, reader, writer, client_id: int, first_line: str) -> SessionOptions:
+        """세션 첫 줄로 들어온 옵션 명령부터 START까지 처리
+
+        서버는 옵션을 기다리지 않고 바로 Room 1을 시작하므로, 아무것도 보내지 않는
+        클라이언트는 기본 텍스트 프로토콜을 지연 없이 사용한다. 첫 줄이 옵션
+        명령이면 START까지 한 줄씩 읽어 처리한 뒤 Room 1을 새로 시작한다.
+
+          PROTO 2 [varint|int32] [zlib]   바이너리 프로토콜(v2) 사용
+          BATCH <N>                       쿼리를 N개씩 묶어서 전송 (답변은 파이프라인으로)
+          START                           협상 종료 ("START OK" 이후 Room 1부터 다시 시작)
+        """
+        options = SessionOptions()
+        options.accept_options = False
+        line = first_line
+
+        # Room 1의 답변 프롬프트 뒤에 이어 붙지 않도록 응답은 새 줄에서 시작
+        if not await self.safe_write(writer, b"\n", client_id):
+            return options
+
+        while True:
+            command = line.split()
+            if command[:1] == ['START']:
+                await self.safe_write(writer, b"START OK\n", client_id)
+                break
+
+            if command:
+                if command[:2] == ['PROTO', '2']:
+                    flags = set(command[2:])
+                    encoding = BinaryWireFormat.INT32 if 'int32' in flags else BinaryWireFormat.VARINT
+                    options.wire = BinaryWireFormat(encoding, compress='zlib' in flags)
+                    reply = f"PROTO 2 OK {options.wire.describe()}\n"
+                    logging.info(f"Client {client_id} negotiated protocol v2 ({options.wire.describe()})")
+                elif command[0] == 'BATCH' and len(command) == 2 and command[1].isdigit():
+                    options.batch_size = max(1, min(int(command[1]), self.MAX_BATCH_SIZE))
+                    reply = f"BATCH {options.batch_size} OK\n"
+                    logging.info(f"Client {client_id} negotiated batch size {options.batch_size}")
+                else:
+                    reply = f"Unknown option: {' '.join(command)[:self.MAX_INPUT_LENGTH]}\n"
+
+                if not await self.safe_write(writer, reply.encode(), client_id):
+                    break
+
+            line = await self.readLine(reader)
+            if not line:
+                break
+
+        return options
+
+    async def handle_room(self, reader, writer, room: int, client_id: int,
+                          options: SessionOptions) -> bool:
         """단일 방 챌린지 처리"""
         logging.info(f"Client {client_id} starting Room {room}")
 
@@ -136,85 +729,97 @@ Complete 3 rooms to escape with the flag!
             return False
 
         # 방 데이터 생성
-        arr, queries = self.generate_room(room)
-        current_array = arr[:]
+        arr, queries = await self.room_pool.take(room)
+        current_array = SortedArray(arr, history=self.SNAPSHOT_HISTORY)
+        original = current_array.snapshot()
         array_lock = asyncio.Lock()
 
         # 배열 전송
-        if not await self.safe_write(writer, f"Array (size={len(arr)}): {arr}\n\n".encode(), client_id):
+        if not await self.safe_write(writer, options.wire.encode_array(arr), client_id):
             return False
 
         # 수정 작업 시작
         config = self.ROOM_CONFIGS[room]
         stop_event = asyncio.Event()
         modification_task = asyncio.create_task(
-            self.modification_task(writer, current_array, array_lock,
+            self.modification_task(writer, options.wire, current_array, array_lock,
                                    config.modification_interval, client_id, stop_event)
         )
 
         try:
-            # 각 쿼리 처리
-            for i, (target, query_type) in enumerate(queries):
-                if query_type == QueryType.FIND_FIRST:
-                    query_msg = f"Query {i + 1}: Find FIRST occurrence of {target}\nIndex: "
+            # 쿼리를 batch_size개씩 묶어서 처리 (기본값 1 = 한 번에 하나씩)
+            batch_size = options.batch_size
+            numbered_queries = list(enumerate(queries, start=1))
+
+            for start in range(0, len(numbered_queries), batch_size):
+                window = numbered_queries[start:start + batch_size]
+
+                if batch_size == 1:
+                    number, (target, query_type) = window[0]
+                    query_msg = self.format_query(number, target, query_type) + "Index: "
                 else:
-                    query_msg = f"Query {i + 1}: Find {target}\nIndex: "
+                    query_msg = ''.join(self.format_query(number, target, query_type)
+                                        for number, (target, query_type) in window)
+                    query_msg += f"Answers ({len(window)}): "
+
+                async with array_lock:
+                    issued_version = current_array.version
 
                 if not await self.safe_write(writer, query_msg.encode(), client_id):
                     return False
+                issued_at = asyncio.get_running_loop().time()
 
+                results = []
                 try:
-                    # 답변 읽기
-                    response_data = await self.readLine(reader)
-                    response = response_data.strip()
-
-                    # 현재 배열 상태 확인
-                    async with array_lock:
-                        array_size = len(current_array)
-                        current_array_copy = current_array[:]
-
-                    # 입력 검증
-                    user_answer = self.validate_input(response, array_size)
-
-                    # 예상 답변 계산
-                    if query_type == QueryType.FIND_FIRST:
-                        expected_original = self.binary_search_first(arr, target)
-                        expected_current = self.binary_search_first(current_array_copy, target)
-                    else:
-                        expected_original = self.binary_search(arr, target)
-                        expected_current = self.binary_search(current_array_copy, target)
-
-                    # 답변 확인
-                    if user_answer == expected_original or user_answer == expected_current:
-                        result_msg = f"✅ Correct! {'Found at index' if user_answer != -1 else 'Not in array'} {user_answer}\n"
-                        await self.safe_write(writer, result_msg.encode(), client_id)
-                        logging.info(f"Client {client_id} Room {room} Query {i + 1}: Correct")
-                    else:
-                        result_msg = f"❌ Wrong! Expected {expected_original} (original) or {expected_current} (current), got {user_answer}\n"
-                        await self.safe_write(writer, result_msg.encode(), client_id)
-
-                        # 디버그 정보
-                        if expected_current != -1:
-                            debug_msg = f"(Debug: Target {target} is at index {expected_current} in current array)\n"
-                        elif expected_original != -1:
-                            debug_msg = f"(Debug: Target {target} was at index {expected_original} in original array but may have been removed)\n"
-                        else:
-                            debug_msg = f"(Debug: Target {target} is not in the array)\n"
-
-                        await self.safe_write(writer, debug_msg.encode(), client_id)
-                        logging.info(f"Client {client_id} Room {room} Query {i + 1}: Wrong - Game Over")
-                        return False
+                    for number, (target, query_type) in window:
+                        # 답변 읽기 (배치 모드에서는 파이프라인으로 들어온 답변을 차례로 읽음)
+                        response_data = await self.readLine(reader)
+                        response = response_data.strip()
+                        if options.accept_options:
+                            options.accept_options = False
+                            if response.partition(' ')[0] in self.OPTION_COMMANDS:
+                                raise OptionCommand(response)
+                        self.metric_query_latency.observe(asyncio.get_running_loop().time() - issued_at, room=room)
+
+                        # 쿼리 전송 이후 클라이언트가 볼 수 있었던 배열 상태들 (복사 없는 스냅샷)
+                        async with array_lock:
+                            states = current_array.snapshots_since(issued_version)
+
+                        correct, messages = self.grade_answer(response, target, query_type, original, states)
+                        results.extend(messages)
+
+                        self.metric_query_results.inc(room=room, result='correct' if correct else 'wrong')
+                        if not correct:
+                            self.metric_room_results.inc(room=room, result='failed')
+                            await self.safe_write(writer, ''.join(results).encode(), client_id)
+                            logging.info(f"Client {client_id} Room {room} Query {number}: Wrong - Game Over",
+                                         extra={'event': 'query', 'client_id': client_id})
+                            return False
+
+                        logging.info(f"Client {client_id} Room {room} Query {number}: Correct "
+                                     f"(versions {issued_version}-{states[-1].version})",
+                                     extra={'event': 'query', 'client_id': client_id})
 
                 except ValueError as e:
-                    await self.safe_write(writer, f"❌ Invalid input: {e}\n".encode(), client_id)
+                    self.metric_query_results.inc(room=room, result='invalid')
+                    self.metric_room_results.inc(room=room, result='failed')
+                    results.append(f"❌ Invalid input: {e}\n")
+                    await self.safe_write(writer, ''.join(results).encode(), client_id)
                     logging.warning(f"Client {client_id} Invalid input: {e}")
                     return False
                 except asyncio.TimeoutError:
-                    await self.safe_write(writer, "❌ Timeout!\n".encode(), client_id)
+                    self.metric_query_results.inc(room=room, result='timeout')
+                    self.metric_room_results.inc(room=room, result='failed')
+                    results.append("❌ Timeout!\n")
+                    await self.safe_write(writer, ''.join(results).encode(), client_id)
                     logging.warning(f"Client {client_id} Timeout")
                     return False
 
+                if not await self.safe_write(writer, ''.join(results).encode(), client_id):
+                    return False
+
             # 방 클리어
+            self.metric_room_results.inc(room=room, result='cleared')
             await self.safe_write(writer, f"🎉 Room {room} cleared!\n".encode(), client_id)
             logging.info(f"Client {client_id} Room {room} cleared")
             return True
@@ -241,7 +846,12 @@ Complete 3 rooms to escape with the flag!
                 return False
 
             writer.write(data)
+            self.metric_bytes_sent.inc(len(data))
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
             await writer.drain()
+            self.metric_drain_wait.observe(loop.time() - started)
             return True
 
         except (BrokenPipeError, ConnectionResetError, OSError) as e:
@@ -251,7 +861,51 @@ Complete 3 rooms to escape with the flag!
             logging.warning(f"Client {client_id} unexpected error during write: {e}")
             return False
 
-    def binary_search(self, arr: List[int], target: int) -> int:
+    def format_query(self, number: int, target: int, query_type: QueryType) -> str:
+        """쿼리 한 줄 생성"""
+        if query_type == QueryType.FIND_FIRST:
+            return f"Query {number}: Find FIRST occurrence of {target}\n"
+        return f"Query {number}: Find {target}\n"
+
+    def grade_answer(self, response: str, target: int, query_type: QueryType,
+                     original: SortedArrayView, states: List[SortedArrayView]) -> Tuple[bool, List[str]]:
+        """답변 채점 - (정답 여부, 클라이언트에게 보낼 메시지 목록)
+
+        원본 배열 또는 states(쿼리 전송 이후의 배열 상태들) 중 하나의 정답과
+        일치하면 정답이다. 잘못된 입력이면 ValueError를 발생시킨다.
+        """
+        # 입력 검증
+        array_size = max(len(original), *(len(state) for state in states))
+        user_answer = self.validate_input(response, array_size)
+
+        # 예상 답변 계산
+        expected_original = self.expected_answer(original, target, query_type)
+        expected_states = [self.expected_answer(state, target, query_type) for state in states]
+        expected_current = expected_states[-1]
+
+        # 답변 확인
+        if user_answer == expected_original or user_answer in expected_states:
+            return True, [f"✅ Correct! {'Found at index' if user_answer != -1 else 'Not in array'} {user_answer}\n"]
+
+        result_msg = f"❌ Wrong! Expected {expected_original} (original) or {expected_current} (current), got {user_answer}\n"
+
+        # 디버그 정보
+        if expected_current != -1:
+            debug_msg = f"(Debug: Target {target} is at index {expected_current} in current array)\n"
+        elif expected_original != -1:
+            debug_msg = f"(Debug: Target {target} was at index {expected_original} in original array but may have been removed)\n"
+        else:
+            debug_msg = f"(Debug: Target {target} is not in the array)\n"
+
+        return False, [result_msg, debug_msg]
+
+    def expected_answer(self, arr: Sequence[int], target: int, query_type: QueryType) -> int:
+        """쿼리 타입에 맞는 정답 인덱스 계산"""
+        if query_type == QueryType.FIND_FIRST:
+            return self.binary_search_first(arr, target)
+        return self.binary_search(arr, target)
+
+    def binary_search(self, arr: Sequence[int], target: int) -> int:
         """표준 이진 탐색 구현"""
         left, right = 0, len(arr) - 1
 
@@ -266,7 +920,7 @@ Complete 3 rooms to escape with the flag!
 
         return -1
 
-    def binary_search_first(self, arr: List[int], target: int) -> int:
+    def binary_search_first(self, arr: Sequence[int], target: int) -> int:
         """첫 번째 발생 위치를 찾는 이진 탐색"""
         left, right = 0, len(arr) - 1
         result = -1
@@ -298,80 +952,75 @@ Complete 3 rooms to escape with the flag!
 
         return value
 
-    def generate_room(self, level: int) -> Tuple[List[int], List[Tuple[int, QueryType]]]:
-        """각 방에 대한 배열과 쿼리 생성"""
-        config = self.ROOM_CONFIGS[level]
+    @classmethod
+    def generate_room(cls, level: int) -> Tuple[List[int], List[Tuple[int, QueryType]]]:
+        """각 방에 대한 배열과 쿼리 생성 (NumPy 벡터 연산, 프로세스 풀에서 실행)"""
+        config = cls.ROOM_CONFIGS[level]
+        rng = np.random.default_rng()
         size = random.randint(*config.size_range)
+        low, high = config.value_range
 
         if level == 1:
             # 중복 없는 간단한 정렬 배열
-            arr = sorted(random.sample(range(*config.value_range), size))
-            queries = []
+            arr = np.sort(rng.choice(high - low, size, replace=False) + low)
 
             # 존재하는 값 2개와 존재하지 않는 값 1개
-            present1 = random.choice(arr)
-            present2 = random.choice([x for x in arr if x != present1])
-            not_present = random.choice([x for x in range(*config.value_range) if x not in arr])
+            present1, present2 = arr[rng.choice(size, 2, replace=False)]
+            missing = np.ones(high - low, dtype=bool)
+            missing[arr - low] = False
+            not_present = rng.choice(np.flatnonzero(missing)) + low
 
             queries = [
-                (present1, QueryType.FIND),
-                (present2, QueryType.FIND),
-                (not_present, QueryType.FIND)
+                (int(present1), QueryType.FIND),
+                (int(present2), QueryType.FIND),
+                (int(not_present), QueryType.FIND)
             ]
             random.shuffle(queries)
 
         elif level == 2:
             # 중간 크기 배열
-            arr = sorted(random.sample(range(*config.value_range), size))
-            queries = []
+            arr = np.sort(rng.choice(high - low, size, replace=False) + low)
 
             # 존재하는 값 3개
-            for _ in range(3):
-                queries.append((random.choice(arr), QueryType.FIND))
+            queries = [(int(target), QueryType.FIND) for target in rng.choice(arr, 3)]
 
             # 최댓값보다 큰 값 1개
-            max_val = max(arr)
+            max_val = int(arr[-1])
             queries.append((random.randint(max_val + 1, max_val + 100), QueryType.FIND))
             random.shuffle(queries)
 
         else:  # level 3
             # 중복을 포함한 큰 배열
-            unique_vals = random.sample(range(*config.value_range), size // 2)
-            arr = []
-            for val in unique_vals:
-                count = random.randint(1, 4)
-                arr.extend([val] * count)
-            arr = sorted(arr[:size])
+            unique_vals = rng.choice(high - low, size // 2, replace=False) + low
+            counts = rng.integers(1, 5, size=len(unique_vals))
+            arr = np.sort(np.repeat(unique_vals, counts)[:size])
 
             queries = []
-            duplicates = [x for x in set(arr) if arr.count(x) > 1]
+            duplicates = np.flatnonzero(np.bincount(arr) > 1)
 
             # 중복값에 대한 "첫 번째 찾기" 쿼리 추가
-            if duplicates:
-                for _ in range(min(2, len(duplicates))):
-                    if duplicates:
-                        target = random.choice(duplicates)
-                        queries.append((target, QueryType.FIND_FIRST))
-                        duplicates.remove(target)
+            if len(duplicates):
+                for target in rng.choice(duplicates, min(2, len(duplicates)), replace=False):
+                    queries.append((int(target), QueryType.FIND_FIRST))
 
             # 나머지 쿼리 채우기
-            used_targets = {q[0] for q in queries}
-            available_elements = [x for x in arr if x not in used_targets]
+            used_targets = [q[0] for q in queries]
+            available_elements = arr[~np.isin(arr, used_targets)]
+            max_val = int(arr[-1])
 
             while len(queries) < config.queries:
-                if available_elements and random.random() < 0.8:
-                    target = random.choice(available_elements)
+                if len(available_elements) and random.random() < 0.8:
+                    target = int(rng.choice(available_elements))
                     queries.append((target, QueryType.FIND))
                 else:
-                    max_val = max(arr)
                     target = random.randint(max_val + 1, max_val + 100)
                     queries.append((target, QueryType.FIND))
 
             random.shuffle(queries)
 
-        return arr, queries
+        return arr.tolist(), queries
 
-    async def apply_modification(self, writer, array: List[int],
+    async def apply_modification(self, writer, wire, array: SortedArray,
                                  array_lock: asyncio.Lock, client_id: int) -> None:
         """배열에 무작위 수정 적용"""
         async with array_lock:
@@ -384,26 +1033,14 @@ Complete 3 rooms to escape with the flag!
                 if modification_type == 'insert':
                     new_value = random.randint(1, self.MAX_ARRAY_VALUE)
 
-                    # 정렬 순서를 유지하기 위한 올바른 위치 찾기
-                    insert_pos = 0
-                    for i, val in enumerate(array):
-                        if new_value <= val:
-                            insert_pos = i
-                            break
-                    else:
-                        insert_pos = len(array)
-
-                    array.insert(insert_pos, new_value)
-                    msg = f"🔄 ARRAY MODIFIED: INSERT at index {insert_pos} value {new_value}\n"
-                    await self.safe_write(writer, msg.encode(), client_id)
-                    logging.debug(f"Client {client_id} {msg.strip()}")
+                    # 정렬 순서를 유지하는 위치(bisect_left)에 삽입
+                    insert_pos = array.insert(new_value)
+                    event = (Modification.INSERT, insert_pos, new_value)
 
                 elif modification_type == 'remove' and len(array) > self.MIN_ARRAY_SIZE:
                     remove_pos = random.randint(0, len(array) - 1)
                     removed_value = array.pop(remove_pos)
-                    msg = f"🔄 ARRAY MODIFIED: REMOVE at index {remove_pos} (was {removed_value})\n"
-                    await self.safe_write(writer, msg.encode(), client_id)
-                    logging.debug(f"Client {client_id} {msg.strip()}")
+                    event = (Modification.REMOVE, remove_pos, removed_value)
 
                 elif modification_type == 'modify':
                     modify_pos = random.randint(0, len(array) - 1)
@@ -414,23 +1051,20 @@ Complete 3 rooms to escape with the flag!
                     array.pop(modify_pos)
 
                     # 새 값을 올바른 위치에 삽입
-                    insert_pos = 0
-                    for i, val in enumerate(array):
-                        if new_value <= val:
-                            insert_pos = i
-                            break
-                    else:
-                        insert_pos = len(array)
-
-                    array.insert(insert_pos, new_value)
-                    msg = f"🔄 ARRAY MODIFIED: MODIFY at index {modify_pos} from {old_value} to {new_value} (now at index {insert_pos})\n"
-                    await self.safe_write(writer, msg.encode(), client_id)
-                    logging.debug(f"Client {client_id} {msg.strip()}")
+                    insert_pos = array.insert(new_value)
+                    event = (Modification.MODIFY, modify_pos, old_value, new_value, insert_pos)
+
+                else:
+                    return
+
+                await self.safe_write(writer, wire.encode_modification(*event), client_id)
+                logging.debug(f"Client {client_id} {TextWireFormat.format_modification(*event).strip()}",
+                              extra={'event': 'modification', 'client_id': client_id})
 
             except Exception as e:
                 logging.error(f"Client {client_id} error applying modification: {e}")
 
-    async def modification_task(self, writer, array: List[int],
+    async def modification_task(self, writer, wire, array: SortedArray,
                                 array_lock: asyncio.Lock, interval: float,
                                 client_id: int, stop_event: asyncio.Event) -> None:
         """주기적으로 배열 수정"""
@@ -441,7 +1075,7 @@ Complete 3 rooms to escape with the flag!
                 await asyncio.sleep(interval)
                 if stop_event.is_set():
                     break
-                await self.apply_modification(writer, array, array_lock, client_id)
+                await self.apply_modification(writer, wire, array, array_lock, client_id)
         except asyncio.CancelledError:
             logging.debug(f"Client {client_id} modification task cancelled")
         except Exception as e:
@@ -451,5 +1085,17 @@ Complete 3 rooms to escape with the flag!
 
 
 if __name__ == '__main__':
-    server = ProblemServer(host='0.0.0.0', port=10437)
-    asyncio.run(server.run())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Binary Maze Runner server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=10437)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of SO_REUSEPORT worker processes (default: 1, no fork)')
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        run_workers(lambda slots, worker_id: ProblemServer(args.host, args.port, slots, worker_id),
+                    ProblemServer.MAX_CONNECTIONS, args.workers, LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
+    else:
+        setup_logging(LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
+        server = ProblemServer(host=args.host, port=args.port)
+        asyncio.run(server.run())
\ No newline at end of file
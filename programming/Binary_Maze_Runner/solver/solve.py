@@ -1,23 +1,37 @@
 #!/usr/bin/env python3
+import codecs
 import socket
 import re
+import struct
 import time
 import threading
 import logging
+import zlib
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 class BinaryMazeSolver:
-    def __init__(self, host='localhost', port=10437):
+    # 프로토콜 v2 바이너리 프레임 (서버의 BinaryWireFormat 참고)
+    ARRAY_INT32 = 1
+    ARRAY_VARINT = 2
+    ARRAY_ZLIB = 0x80
+    MODIFICATION_RECORD = struct.Struct(">BIIII")
+
+    def __init__(self, host='localhost', port=10437, proto2=False, batch=None):
         """Binary Maze 서버 클라이언트 초기화"""
         self.host = host
         self.port = port
+        self.proto2 = proto2  # 바이너리 프로토콜(v2) 사용 여부
+        self.batch = batch  # 배치 모드에서 한 번에 받을 쿼리 수 (None이면 순차 모드)
         self.sock = None
         self.current_array = []  # 현재 배열 상태 추적
         self.array_lock = threading.Lock()  # 배열 수정 동기화
         self.modification_buffer = []  # 수정 메시지 버퍼
         self.current_room = 0
+        self.raw_buffer = b""  # 아직 완성되지 않은 v2 프레임
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self.received_array = None  # v2 배열 프레임에서 디코딩한 배열
 
     def connect(self):
         """서버에 연결"""
@@ -25,9 +39,95 @@ class BinaryMazeSolver:
         self.sock.connect((self.host, self.port))
         logging.info(f"Connected to Binary Maze Runner server at {self.host}:{self.port}")
 
+        if self.negotiates():
+            options = b""
+            if self.proto2:
+                options += b"PROTO 2 varint zlib\n"
+                logging.info("Requested protocol v2 (varint, zlib)")
+            if self.batch:
+                options += f"BATCH {self.batch}\n".encode()
+                logging.info(f"Requested batch size {self.batch}")
+            self.sock.sendall(options + b"START\n")
+
+    def negotiates(self):
+        """세션 옵션을 보내는지 여부"""
+        return self.proto2 or bool(self.batch)
+
     def receive_data(self, size=65536):
         """소켓에서 데이터 수신 - 큰 배열을 위해 버퍼 크기 증가"""
-        return self.sock.recv(size).decode()
+        data = self.sock.recv(size)
+        if not self.proto2:
+            return data.decode()
+        return self.extract_frames(data)
+
+    def extract_frames(self, data):
+        """수신 데이터에서 v2 바이너리 프레임을 처리하고 나머지 텍스트를 반환"""
+        raw = self.raw_buffer + data
+        text = b""
+
+        while raw:
+            start = raw.find(b"\x00")
+            if start == -1:
+                text += raw
+                raw = b""
+                break
+
+            text += raw[:start]
+            raw = raw[start:]
+
+            if raw[1:2] == b"A" and len(raw) >= 6:
+                length = struct.unpack(">I", raw[2:6])[0]
+                if len(raw) < 6 + length:
+                    break
+                self.received_array = self.decode_array_frame(raw[6:6 + length])
+                raw = raw[6 + length:]
+            elif raw[1:2] == b"M" and len(raw) >= 2 + self.MODIFICATION_RECORD.size:
+                record = self.MODIFICATION_RECORD.unpack(raw[2:2 + self.MODIFICATION_RECORD.size])
+                raw = raw[2 + self.MODIFICATION_RECORD.size:]
+                self.apply_modification_record(*record)
+            else:
+                # 프레임이 아직 다 도착하지 않음
+                break
+
+        self.raw_buffer = raw
+        return self.text_decoder.decode(text)
+
+    def decode_array_frame(self, payload):
+        """v2 배열 프레임 디코딩 (int32 또는 차분 varint, 선택적 zlib)"""
+        flags, count = struct.unpack(">BI", payload[:5])
+        data = payload[5:]
+        if flags & self.ARRAY_ZLIB:
+            data = zlib.decompress(data)
+
+        if flags & ~self.ARRAY_ZLIB == self.ARRAY_INT32:
+            return list(struct.unpack(f">{count}i", data))
+
+        array = []
+        value = shift = delta = 0
+        for byte in data:
+            delta |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            value += delta
+            array.append(value)
+            delta = shift = 0
+        return array
+
+    def apply_modification_record(self, op, index, value, new_value, new_index):
+        """v2 수정 레코드를 텍스트 수정 메시지와 같은 방식으로 적용"""
+        if op == 1:
+            mod_line = f"INSERT at index {index} value {value}"
+        elif op == 2:
+            mod_line = f"REMOVE at index {index} (was {value})"
+        else:
+            mod_line = f"MODIFY at index {index} from {value} to {new_value} (now at index {new_index})"
+
+        logging.info(f"[MODIFICATION] {mod_line}")
+        self.modification_buffer.append(mod_line)
+        # Room 3에서만 실시간 적용
+        if self.current_room == 3:
+            self.apply_modification(mod_line)
 
     def receive_until(self, delimiter, timeout=10):
         """특정 구분자를 찾을 때까지 데이터 수신"""
@@ -146,21 +246,23 @@ class BinaryMazeSolver:
             try:
                 new_data = self.receive_data()
                 buffer += new_data
-
-                # 배열 수정 메시지 처리
-                if '🔄 ARRAY MODIFIED' in new_data:
-                    modification_lines = [line for line in new_data.split('\n') if '🔄 ARRAY MODIFIED' in line]
-                    for mod_line in modification_lines:
-                        logging.info(f"[MODIFICATION] {mod_line}")
-                        self.modification_buffer.append(mod_line)
-                        # Room 3에서만 실시간 적용
-                        if self.current_room == 3:
-                            self.apply_modification(mod_line)
+                self.process_modifications(new_data)
 
             except socket.timeout:
                 break
         return buffer
 
+    def process_modifications(self, new_data):
+        """수신 데이터의 텍스트 배열 수정 메시지 처리"""
+        if '🔄 ARRAY MODIFIED' in new_data:
+            modification_lines = [line for line in new_data.split('\n') if '🔄 ARRAY MODIFIED' in line]
+            for mod_line in modification_lines:
+                logging.info(f"[MODIFICATION] {mod_line}")
+                self.modification_buffer.append(mod_line)
+                # Room 3에서만 실시간 적용
+                if self.current_room == 3:
+                    self.apply_modification(mod_line)
+
     def wait_for_array_complete(self, buffer, timeout=10):
         """버퍼에 완전한 배열이 들어올 때까지 대기"""
         start_time = time.time()
@@ -195,6 +297,21 @@ class BinaryMazeSolver:
 
         return buffer
 
+    def wait_for_binary_array(self, buffer, timeout=10):
+        """v2 배열 프레임이 도착할 때까지 대기"""
+        start_time = time.time()
+
+        while self.received_array is None and time.time() - start_time < timeout:
+            try:
+                new_data = self.receive_data()
+                if not new_data and self.received_array is None and not self.raw_buffer:
+                    break
+                buffer += new_data
+            except socket.timeout:
+                break
+
+        return buffer
+
     def solve_room(self, room_number, buffer):
         """단일 방 해결"""
         self.current_room = room_number
@@ -209,20 +326,25 @@ class BinaryMazeSolver:
         room_start_pos = buffer.rfind(f"--- Room {room_number} ---")
         buffer = buffer[room_start_pos:]
 
-        # 완전한 배열 대기
-        buffer = self.wait_for_array_complete(buffer)
+        if self.proto2:
+            # v2에서는 배열이 바이너리 프레임으로 도착
+            buffer = self.wait_for_binary_array(buffer)
+            array, self.received_array = self.received_array, None
+        else:
+            # 완전한 배열 대기
+            buffer = self.wait_for_array_complete(buffer)
 
-        # 버퍼에서 가장 최근 배열 찾기
-        array_matches = list(re.finditer(r'Array \(size=\d+\): \[.*?\]', buffer, re.DOTALL))
+            # 버퍼에서 가장 최근 배열 찾기
+            array_matches = list(re.finditer(r'Array \(size=\d+\): \[.*?\]', buffer, re.DOTALL))
 
-        if array_matches:
-            # 가장 최근(마지막) 배열 매치 사용
-            last_match = array_matches[-1]
-            array_data = buffer[last_match.start():last_match.end()]
-            array = self.parse_array_from_data(array_data)
-        else:
-            logging.error("Could not find array!")
-            return None
+            if array_matches:
+                # 가장 최근(마지막) 배열 매치 사용
+                last_match = array_matches[-1]
+                array_data = buffer[last_match.start():last_match.end()]
+                array = self.parse_array_from_data(array_data)
+            else:
+                logging.error("Could not find array!")
+                return None
 
         if array is None:
             logging.error("Could not parse array!")
@@ -244,78 +366,83 @@ class BinaryMazeSolver:
         logging.info(f"Total queries for Room {room_number}: {num_queries}")
 
         # 쿼리 처리
-        for q in range(num_queries):
-            # 쿼리 대기
-            buffer = self.wait_for_pattern(buffer, f"Query {q + 1}:", timeout=30)
-            buffer = self.wait_for_pattern(buffer, "Index: ", timeout=30)
-
-            # 버퍼에서 가장 최근 쿼리 찾기
-            query_pattern = rf'Query {q + 1}: (.+?)\n.*?Index:'
-            query_matches = list(re.finditer(query_pattern, buffer, re.DOTALL))
-
-            if query_matches:
-                # 가장 최근(마지막) 매치 사용
-                query_match = query_matches[-1]
-                query_text = query_match.group(1).strip()
-
-                # Room 3에서는 진행상황 표시
-                if room_number == 3:
-                    logging.info(f"[{q + 1}/{num_queries}] Query: {query_text}")
-                else:
-                    logging.info(f"Query {q + 1}: {query_text}")
-
-                # 타겟과 쿼리 타입 파싱
-                answer = None
-                target = None
-
-                # 현재 배열 상태 사용
-                with self.array_lock:
-                    current_array_copy = self.current_array[:]
-
-                if "Find FIRST occurrence of" in query_text:
-                    # 첫 번째 발생 위치 찾기
-                    target_match = re.search(r'Find FIRST occurrence of (\d+)', query_text)
-                    if target_match:
-                        target = int(target_match.group(1))
-                        answer = self.binary_search_first(current_array_copy, target)
-                else:
-                    # 일반 이진 탐색
-                    target_match = re.search(r'Find (\d+)', query_text)
-                    if target_match:
-                        target = int(target_match.group(1))
-                        answer = self.binary_search(current_array_copy, target)
-
-                if answer is not None and target is not None:
-                    logging.debug(f"Target: {target}, Answer: {answer}")
-
-                    # 답변 전송
-                    self.sock.send(f"{answer}\n".encode())
-
-                    # 응답 읽기
-                    response = self.receive_data()
-                    buffer += response
-
-                    # 수정 메시지 처리
-                    if '🔄 ARRAY MODIFIED' in response:
-                        modification_lines = [line for line in response.split('\n') if '🔄 ARRAY MODIFIED' in line]
-                        for mod_line in modification_lines:
-                            logging.info(f"[MODIFICATION] {mod_line}")
-                            if room_number == 3:
-                                self.apply_modification(mod_line)
-
-                    # 결과 확인
-                    if "✅ Correct!" in response:
-                        logging.info(f"Query {q + 1}: Correct!")
-                    elif "❌ Wrong!" in response:
-                        logging.error(f"Query {q + 1}: Wrong answer!")
-                        # 디버그 정보 출력
-                        debug_lines = [line for line in response.split('\n') if '(Debug:' in line]
-                        for debug_line in debug_lines:
-                            logging.info(debug_line)
-                        return None
-            else:
-                logging.error(f"Could not find Query {q + 1}")
+        if self.batch:
+            buffer = self.solve_batched_queries(room_number, buffer, num_queries)
+            if buffer is None:
                 return None
+        else:
+            for q in range(num_queries):
+                # 쿼리 대기
+                buffer = self.wait_for_pattern(buffer, f"Query {q + 1}:", timeout=30)
+                buffer = self.wait_for_pattern(buffer, "Index: ", timeout=30)
+
+                # 버퍼에서 가장 최근 쿼리 찾기
+                query_pattern = rf'Query {q + 1}: (.+?)\n.*?Index:'
+                query_matches = list(re.finditer(query_pattern, buffer, re.DOTALL))
+
+                if query_matches:
+                    # 가장 최근(마지막) 매치 사용
+                    query_match = query_matches[-1]
+                    query_text = query_match.group(1).strip()
+
+                    # Room 3에서는 진행상황 표시
+                    if room_number == 3:
+                        logging.info(f"[{q + 1}/{num_queries}] Query: {query_text}")
+                    else:
+                        logging.info(f"Query {q + 1}: {query_text}")
+
+                    # 타겟과 쿼리 타입 파싱
+                    answer = None
+                    target = None
+
+                    # 현재 배열 상태 사용
+                    with self.array_lock:
+                        current_array_copy = self.current_array[:]
+
+                    if "Find FIRST occurrence of" in query_text:
+                        # 첫 번째 발생 위치 찾기
+                        target_match = re.search(r'Find FIRST occurrence of (\d+)', query_text)
+                        if target_match:
+                            target = int(target_match.group(1))
+                            answer = self.binary_search_first(current_array_copy, target)
+                    else:
+                        # 일반 이진 탐색
+                        target_match = re.search(r'Find (\d+)', query_text)
+                        if target_match:
+                            target = int(target_match.group(1))
+                            answer = self.binary_search(current_array_copy, target)
+
+                    if answer is not None and target is not None:
+                        logging.debug(f"Target: {target}, Answer: {answer}")
+
+                        # 답변 전송
+                        self.sock.send(f"{answer}\n".encode())
+
+                        # 응답 읽기
+                        response = self.receive_data()
+                        buffer += response
+
+                        # 수정 메시지 처리
+                        if '🔄 ARRAY MODIFIED' in response:
+                            modification_lines = [line for line in response.split('\n') if '🔄 ARRAY MODIFIED' in line]
+                            for mod_line in modification_lines:
+                                logging.info(f"[MODIFICATION] {mod_line}")
+                                if room_number == 3:
+                                    self.apply_modification(mod_line)
+
+                        # 결과 확인
+                        if "✅ Correct!" in response:
+                            logging.info(f"Query {q + 1}: Correct!")
+                        elif "❌ Wrong!" in response:
+                            logging.error(f"Query {q + 1}: Wrong answer!")
+                            # 디버그 정보 출력
+                            debug_lines = [line for line in response.split('\n') if '(Debug:' in line]
+                            for debug_line in debug_lines:
+                                logging.info(debug_line)
+                            return None
+                else:
+                    logging.error(f"Could not find Query {q + 1}")
+                    return None
 
         # 방 클리어 메시지 대기
         buffer = self.wait_for_pattern(buffer, f"Room {room_number} cleared!", timeout=30)
@@ -323,6 +450,56 @@ class BinaryMazeSolver:
 
         return buffer
 
+    def solve_batched_queries(self, room_number, buffer, num_queries):
+        """배치 모드 쿼리 처리 - 쿼리 묶음을 받아 답을 한꺼번에(파이프라인으로) 전송"""
+        answered = 0
+        while answered < num_queries:
+            # "Answers (N): " 프롬프트 대기 (배열 줄의 "): "와 헷갈리지 않도록 앞부분부터 찾음)
+            buffer = self.wait_for_pattern(buffer, "Answers (", timeout=30)
+            head, _, buffer = buffer.partition("Answers (")
+            buffer = self.wait_for_pattern(buffer, "): ", timeout=30)
+            count_text, _, buffer = buffer.partition("): ")
+            count = int(count_text)
+
+            queries = re.findall(r'Query \d+: (.+?)\n', head)[-count:]
+            with self.array_lock:
+                current_array_copy = self.current_array[:]
+            answers = [self.answer_query(query_text, current_array_copy) for query_text in queries]
+            if len(answers) != count or None in answers:
+                logging.error(f"Could not parse batch of {count} queries")
+                return None
+
+            # 답변을 한 번에 전송
+            self.sock.sendall(''.join(f"{answer}\n" for answer in answers).encode())
+
+            # 결과 count줄 대기
+            start_time = time.time()
+            while buffer.count("✅ Correct!") < count and "❌" not in buffer and time.time() - start_time < 30:
+                new_data = self.receive_data()
+                buffer += new_data
+                self.process_modifications(new_data)
+
+            if "❌" in buffer or buffer.count("✅ Correct!") < count:
+                logging.error(f"Batch failed: {buffer[buffer.find('❌'):].strip()[:200]}")
+                return None
+
+            answered += count
+            logging.info(f"Room {room_number}: {answered}/{num_queries} answered (batch of {count})")
+
+        return buffer
+
+    def answer_query(self, query_text, array):
+        """쿼리 한 줄에 대한 답 계산 (파싱 실패 시 None)"""
+        if "Find FIRST occurrence of" in query_text:
+            target_match = re.search(r'Find FIRST occurrence of (\d+)', query_text)
+            if target_match:
+                return self.binary_search_first(array, int(target_match.group(1)))
+        else:
+            target_match = re.search(r'Find (\d+)', query_text)
+            if target_match:
+                return self.binary_search(array, int(target_match.group(1)))
+        return None
+
     def solve(self):
         """메인 문제 해결 로직"""
         try:
@@ -333,6 +510,11 @@ class BinaryMazeSolver:
             buffer = self.wait_for_pattern(buffer, "Complete 3 rooms to escape with the flag!")
             logging.info("Game Started")
 
+            if self.negotiates():
+                # 옵션은 세션 첫 줄로 보냈으므로 START OK 이후 Room 1이 협상한 옵션으로 다시 시작됨
+                buffer = self.wait_for_pattern(buffer, "START OK\n")
+                buffer = buffer[buffer.find("START OK\n") + len("START OK\n"):]
+
             # 각 방 처리
             for room in range(1, 4):
                 buffer = self.solve_room(room, buffer)
@@ -369,8 +551,21 @@ if __name__ == "__main__":
     import sys
 
     # 명령줄 인자로 호스트와 포트 받기
-    host = sys.argv[1] if len(sys.argv) > 1 else 'localhost'
-    port = int(sys.argv[2]) if len(sys.argv) > 2 else 10437
+    # --proto2: 바이너리 프로토콜(v2)로 배열 수신
+    # --batch[=N]: 쿼리를 N개씩(기본 25개) 받아 답을 파이프라인으로 전송
+    proto2 = False
+    batch = None
+    args = []
+    for arg in sys.argv[1:]:
+        if arg == '--proto2':
+            proto2 = True
+        elif arg == '--batch' or arg.startswith('--batch='):
+            batch = int(arg.split('=', 1)[1]) if '=' in arg else 25
+        else:
+            args.append(arg)
+
+    host = args[0] if len(args) > 0 else 'localhost'
+    port = int(args[1]) if len(args) > 1 else 10437
 
-    solver = BinaryMazeSolver(host=host, port=port)
+    solver = BinaryMazeSolver(host=host, port=port, proto2=proto2, batch=batch)
     solver.solve()
\ No newline at end of file
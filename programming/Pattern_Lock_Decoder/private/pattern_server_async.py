@@ -1,53 +1,397 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
+import base64
+import functools
+import os
 import random
 import logging
-from typing import Tuple
+import signal
+import socket
+import struct
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple
+
+from string_kernels import (diff_size, hirschberg_lcs, is_subsequence, lcs_length, myers_diff,
+                            ukkonen_edit_distance)
+
+# Shared module: ADDed next to this file in the container, found under common/ in the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'common'))
+from server_common import (AdmissionController, AdmissionRejected, ConnectionSlots,  # noqa: E402
+                           MetricsRegistry, monitor_event_loop_lag, run_workers, setup_logging)
+
+# Per-event sampling ratio (0-1) and maximum records per second
+LOG_SAMPLE_RATES = {'answer': 1.0, 'timing': 1.0}
+LOG_RATE_LIMITS = {'answer': 200, 'timing': 200}
+
+
+def seed_worker() -> None:
+    """Reseed the RNG in forked worker processes so they don't repeat the parent's challenges"""
+    random.seed()
+
+
+class ChallengePool:
+    """Pre-generated (seq1, seq2, expected) challenges per level
+
+    Generation and LCS grading run in the executor (a process pool), and each
+    level is topped up in the background whenever it drops below size entries.
+    Taking a challenge is O(1); we only wait for the executor when a level's
+    pool is empty.
+
+    Failed builds are retried after a growing delay, and a broken process pool
+    (BrokenProcessPool) is replaced with a fresh one from executor_factory.
+    """
+
+    RETRY_DELAY = 0.5  # first delay before refilling after a failed build (doubles while failures continue)
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(self, factory, levels, size: int, executor_factory: Callable[[], Executor]):
+        self._factory = factory
+        self._executor_factory = executor_factory
+        self._executor = executor_factory()
+        self._size = size
+        self._challenges = {level: deque() for level in levels}
+        self._pending = {level: 0 for level in levels}
+        self._failures = {level: 0 for level in levels}  # consecutive failures, for the back-off
+        self._retries = {level: None for level in levels}  # scheduled refill (TimerHandle)
+        self._closed = False
+
+    def start(self) -> None:
+        """Start filling the pool for every level"""
+        for level in self._challenges:
+            self._refill(level)
+
+    def shutdown(self) -> None:
+        """Cancel scheduled refills and shut the process pool down"""
+        self._closed = True
+        for handle in self._retries.values():
+            if handle:
+                handle.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _refill(self, level: int) -> None:
+        # While backing off after a failure, the scheduled retry does the refill
+        if self._closed or self._retries[level]:
+            return
+        loop = asyncio.get_running_loop()
+        while len(self._challenges[level]) + self._pending[level] < self._size:
+            executor = self._executor
+            try:
+                future = loop.run_in_executor(executor, self._factory, level)
+            except BrokenProcessPool:
+                self._replace_executor(executor)
+                continue
+            self._pending[level] += 1
+            future.add_done_callback(functools.partial(self._on_built, level, executor))
+
+    def _on_built(self, level: int, executor: Executor, future: asyncio.Future) -> None:
+        self._pending[level] -= 1
+        if future.cancelled() or self._closed:
+            return
+        try:
+            challenge = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._replace_executor(executor)
+            self._schedule_retry(level, e)
+            return
+        self._failures[level] = 0
+        self._challenges[level].append(challenge)
+
+    def _schedule_retry(self, level: int, error: Exception) -> None:
+        """Schedule a refill after a failed build, backing off (one per level)"""
+        if self._retries[level]:
+            return
+        self._failures[level] += 1
+        delay = min(self.RETRY_DELAY * 2 ** (self._failures[level] - 1), self.MAX_RETRY_DELAY)
+        logging.error(f"Level {level} challenge generation failed: {error!r}, refilling in {delay:.1f}s")
+        self._retries[level] = asyncio.get_running_loop().call_later(delay, self._retry, level)
+
+    def _retry(self, level: int) -> None:
+        self._retries[level] = None
+        self._refill(level)
+
+    def _replace_executor(self, broken: Executor) -> None:
+        """Swap a broken process pool for a new one (no-op if already replaced)"""
+        if broken is not self._executor or self._closed:
+            return
+        logging.warning("Challenge generator process pool is broken, starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._executor_factory()
+
+    async def take(self, level: int) -> 'Challenge':
+        """Take a pre-generated challenge (waiting for a fresh one if the pool is empty)"""
+        challenges = self._challenges[level]
+        if challenges:
+            challenge = challenges.popleft()
+        else:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                challenge = await loop.run_in_executor(executor, self._factory, level)
+            except BrokenProcessPool:
+                # The process pool broke; build once more on a fresh one
+                self._replace_executor(executor)
+                challenge = await loop.run_in_executor(self._executor, self._factory, level)
+        self._refill(level)
+        return challenge
+
+
+# Packed byte -> the four bases it holds (first base in the two high bits)
+PACKED_TEXT = [''.join('ACGT'[(byte >> shift) & 3] for shift in (6, 4, 2, 0)) for byte in range(256)]
+TEXT_TO_DIGITS = str.maketrans('ACGT', '0123')
+
+
+def _packed_hex_table(code: int) -> bytes:
+    """bytes.translate table: packed byte -> hex digit whose bit k is set when base k of the byte is `code`"""
+    digits = b'0123456789abcdef'
+    return bytes(digits[sum(1 << k for k, shift in enumerate((6, 4, 2, 0)) if (byte >> shift) & 3 == code)]
+                 for byte in range(256))
+
+
+PACKED_HEX_MASKS = {base: _packed_hex_table(code) for code, base in enumerate('ACGT')}
+
+
+class PackedSequence:
+    """DNA sequence stored at 2 bits per base (A=0, C=1, G=2, T=3, first base in the high bits)
+
+    Generation, pickling to and from the process pool and per-base bit masks
+    all work on the packed bytes, so a sequence of n bases costs about n/4
+    bytes until it is turned into text for the client.
+    """
+
+    def __init__(self, data: bytes, length: int):
+        self.data = data
+        self.length = length
+
+    @classmethod
+    def random(cls, length: int) -> 'PackedSequence':
+        """Uniformly random sequence straight from os.urandom (4 bases per byte)"""
+        return cls(os.urandom((length + 3) // 4), length)
+
+    @classmethod
+    def from_text(cls, text: str) -> 'PackedSequence':
+        digits = (text + 'A' * (-len(text) % 4)).translate(TEXT_TO_DIGITS)
+        data = int(digits, 4).to_bytes(len(digits) // 4, 'big') if digits else b''
+        return cls(data, len(text))
+
+    def __len__(self) -> int:
+        return self.length
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+    def __str__(self) -> str:
+        return self.to_text()
+
+    def __iter__(self):
+        return iter(self.to_text())
+
+    def to_text(self) -> str:
+        return ''.join([PACKED_TEXT[byte] for byte in self.data])[:self.length]
+
+    def to_base64(self) -> str:
+        """Packed wire encoding"""
+        return base64.b64encode(self.data).decode()
+
+    def match_masks(self) -> dict:
+        """Bit mask of the positions of each base (bit i = base i), straight from the packed bytes"""
+        if not self.length:
+            return {base: 0 for base in PACKED_HEX_MASKS}
+        all_bits = (1 << self.length) - 1
+        # Reversed bytes put the last bases in the most significant hex digits
+        reversed_data = self.data[::-1]
+        return {base: int(reversed_data.translate(table), 16) & all_bits
+                for base, table in PACKED_HEX_MASKS.items()}
+
+
+class Challenge:
+    """One pattern lock: the two sequences and the reference answer"""
+
+    def __init__(self, kind: str, seq1: PackedSequence, seq2: PackedSequence, answer: int,
+                 lcs: Optional[str] = None):
+        self.kind = kind  # one of ProblemServer.PROMPTS
+        self.seq1 = seq1
+        self.seq2 = seq2
+        self.answer = answer  # LCS length, edit distance or diff size
+        self.lcs = lcs  # one optimal LCS, only computed for 'sequence' levels
+
+
+class SessionOptions:
+    """Options negotiated right after connecting"""
+
+    def __init__(self):
+        self.packed = False  # send sequences as base64 of the 2-bit packed bytes
+        self.rtt = None  # round-trip time measured with PING, in seconds
+        self.accept_options = True  # the session's first line may be an option command
 
 
 class ProblemServer:
     FLAG = "KCTF_Jr{1cs_p4tt3rn_m4st3r_2025}"
     DNA_BASES = 'ACGT'
     MAX_CONNECTIONS = 50
-    CONNECTION_TIMEOUT = 60
+    MAX_WAITING = 50  # clients allowed to queue for a free slot
+    MAX_CONNECTIONS_PER_IP = 10  # connected + waiting sessions per IP
+    ADMISSION_TIMEOUT = 60  # longest time a client may wait in the queue (seconds)
+    OPTION_COMMANDS = ('PACKED', 'PING', 'START')  # first-line commands that start a negotiation
+    PING_SAMPLES = 3  # PING/PONG exchanges per RTT measurement (the minimum is used)
+    PING_TIMEOUT = 1.0  # longest wait for a PONG (seconds)
+    MAX_RTT_COMPENSATION = 0.5  # most time added to a level's limit for network round trips (seconds)
+    # Offsets in Linux struct tcp_info: tcpi_rtt (smoothed) and tcpi_min_rtt (Linux 4.6+), microseconds
+    TCP_INFO_RTT_OFFSET = 68
+    TCP_INFO_MIN_RTT_OFFSET = 148
 
     # Time limits for each level (in seconds)
-    TIME_LIMITS = {1: 30, 2: 20, 3: 15, 4: 10}
+    TIME_LIMITS = {1: 30, 2: 20, 3: 15, 4: 10, 5: 15, 6: 15, 7: 15}
+
+    # Whole-session limit: every level's time limit plus RTT allowance, with
+    # slack for negotiation and the pauses between levels
+    CONNECTION_TIMEOUT = sum(TIME_LIMITS.values()) + len(TIME_LIMITS) * MAX_RTT_COMPENSATION + 30
+
+    # What each level asks for: the LCS length, an actual LCS string, the
+    # edit distance or the size of the shortest insert/delete diff
+    LEVEL_KINDS = {1: 'length', 2: 'length', 3: 'length', 4: 'length', 5: 'sequence', 6: 'edit', 7: 'diff'}
+
+    PROMPTS = {'length': "LCS Length: ", 'sequence': "LCS Sequence: ",
+               'edit': "Edit Distance: ", 'diff': "Diff Size: "}
+    ANSWER_NAMES = {'length': "LCS length", 'edit': "Edit distance", 'diff': "Diff size"}
+
+    CHALLENGE_POOL_SIZE = 16  # challenges kept ready per level
+    CHALLENGE_POOL_WORKERS = 2  # processes generating and grading challenges
+
+    # Sequence length range for each level
+    LEVEL_LENGTHS = {1: (8, 12), 2: (15, 25), 3: (30, 40), 4: (50, 70), 5: (300, 500),
+                     6: (5000, 8000), 7: (5000, 8000)}
+
+    # Levels whose second sequence is a mutated copy of the first (number of point mutations)
+    LEVEL_MUTATIONS = {6: (20, 40), 7: (20, 40)}
 
-    def __init__(self, host: str, port: int):
+    # Metrics HTTP endpoint (METRICS_PORT=0 disables it)
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', '9402'))
+
+    def __init__(self, host: str, port: int, connection_slots: Optional[ConnectionSlots] = None,
+                 worker_id: Optional[int] = None):
         self.host = host
         self.port = port
+        self.worker_id = worker_id
+        self.connection_slots = connection_slots or ConnectionSlots(self.MAX_CONNECTIONS)
         self.active_connections = 0
-        self.connection_semaphore = asyncio.Semaphore(self.MAX_CONNECTIONS)
+        self.admission = AdmissionController(self.connection_slots, self.MAX_WAITING, self.MAX_CONNECTIONS_PER_IP)
+        self.challenge_pool = None
+        self.lag_monitor = None
+
+        # Metrics
+        self.metrics = MetricsRegistry()
+        self.metric_active = self.metrics.gauge('pattern_active_connections', 'Currently connected clients')
+        self.metric_global_active = self.metrics.gauge(
+            'pattern_global_active_connections', 'Connected clients across all worker processes')
+        self.metric_rejected = self.metrics.counter(
+            'pattern_rejected_connections_total', 'Connections refused by admission control', ('reason',))
+        self.metric_waiting = self.metrics.gauge('pattern_admission_queue_length', 'Clients waiting for a free slot')
+        self.metric_admission_wait = self.metrics.histogram(
+            'pattern_admission_wait_seconds', 'Time from connect to being admitted')
+        self.metric_connections = self.metrics.counter('pattern_connections_total', 'Accepted connections')
+        self.metric_bytes_sent = self.metrics.counter('pattern_bytes_sent_total', 'Bytes written to clients')
+        self.metric_drain_wait = self.metrics.histogram('pattern_drain_wait_seconds', 'Time spent in writer.drain()')
+        self.metric_challenge_send = self.metrics.histogram(
+            'pattern_challenge_send_seconds', 'Time to write and drain a challenge', ('level',))
+        self.metric_answer_first_byte = self.metrics.histogram(
+            'pattern_answer_first_byte_seconds', 'Time from sending a challenge to the first answer byte', ('level',))
+        self.metric_answer_latency = self.metrics.histogram(
+            'pattern_answer_latency_seconds', 'Time from sending a challenge to reading the answer', ('level',))
+        self.metric_answer_compute = self.metrics.histogram(
+            'pattern_answer_compute_seconds', 'Answer latency minus the measured RTT', ('level',))
+        self.metric_rtt = self.metrics.histogram('pattern_client_rtt_seconds', 'Round-trip time measured with PING')
+        self.metric_level_results = self.metrics.counter(
+            'pattern_level_results_total', 'Finished levels by outcome', ('level', 'result'))
+        self.metric_loop_lag = self.metrics.histogram('pattern_event_loop_lag_seconds', 'Event loop wake-up delay')
 
     async def run(self):
-        server = await asyncio.start_server(self.on_connect, host=self.host, port=self.port)
-        logging.info(f"Pattern Lock Decoder server started on {self.host}:{self.port}")
-        logging.info(f"Maximum concurrent connections: {self.MAX_CONNECTIONS}")
-        await server.wait_closed()
+        executor_factory = functools.partial(ProcessPoolExecutor, max_workers=self.CHALLENGE_POOL_WORKERS,
+                                             initializer=seed_worker)
+        self.challenge_pool = ChallengePool(self.build_challenge, self.TIME_LIMITS,
+                                            self.CHALLENGE_POOL_SIZE, executor_factory)
+        try:
+            self.challenge_pool.start()
+
+            if self.METRICS_PORT:
+                # Each worker serves metrics on METRICS_PORT + worker_id
+                metrics_port = self.METRICS_PORT + (self.worker_id or 0)
+                await self.metrics.serve(self.METRICS_HOST, metrics_port)
+                self.lag_monitor = asyncio.create_task(monitor_event_loop_lag(self.metric_loop_lag))
+                logging.info(f"Metrics available at http://{self.METRICS_HOST}:{metrics_port}/metrics")
+
+            # In worker mode all workers share the port through SO_REUSEPORT
+            server = await asyncio.start_server(self.on_connect, host=self.host, port=self.port,
+                                                reuse_port=self.worker_id is not None)
+            logging.info(f"Pattern Lock Decoder server started on {self.host}:{self.port}")
+            logging.info(f"Maximum concurrent connections: {self.MAX_CONNECTIONS}")
+
+            # On SIGTERM/SIGINT stop accepting, shut the process pool down and exit
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, stop.set)
+            await stop.wait()
+            logging.info("Shutting down")
+            server.close()
+        finally:
+            self.challenge_pool.shutdown()
 
     async def on_connect(self, reader, writer):
         peername = writer.get_extra_info('peername')
+        ip = peername[0] if peername else 'unknown'
+        loop = asyncio.get_running_loop()
+        connected_at = loop.time()
 
-        async with self.connection_semaphore:
-            self.active_connections += 1
-            logging.info(f"Client connected: {peername}")
-            logging.info(f"Active connections: {self.active_connections}")
+        async def notify_position(position: int) -> bool:
+            self.metric_waiting.set(len(self.admission.waiting))
+            try:
+                self.write(writer, f"⏳ Server busy, you are in queue position {position}. Please wait...\n".encode())
+                await self.drain(writer)
+                return True
+            except (ConnectionError, OSError):
+                return False
+
+        # Hold the slot until the session ends
+        try:
+            await self.admission.acquire(ip, notify_position, self.ADMISSION_TIMEOUT)
+        except AdmissionRejected as e:
+            self.metric_rejected.inc(reason=e.reason)
+            self.metric_waiting.set(len(self.admission.waiting))
+            logging.warning(f"Connection from {peername} rejected: {e} "
+                            f"({self.connection_slots.in_use}/{self.MAX_CONNECTIONS} in use, "
+                            f"{len(self.admission.waiting)} waiting)")
+            try:
+                self.write(writer, f"❌ {e}, please try again later.\n".encode())
+                await self.drain(writer)
+            except (ConnectionError, OSError):
+                pass
+            writer.close()
+            return
 
-            def cleanup(fu):
-                try:
-                    fu.result()
-                except Exception as e:
-                    logging.error(f"Exception in client connection: {e}")
+        self.metric_admission_wait.observe(loop.time() - connected_at)
+        self.metric_waiting.set(len(self.admission.waiting))
+        self.metric_global_active.set(self.connection_slots.in_use)
 
-                self.active_connections -= 1
-                logging.info(f"Client disconnected: {peername}")
-                logging.info(f"Active connections: {self.active_connections}")
+        self.active_connections += 1
+        self.metric_active.inc()
+        self.metric_connections.inc()
+        logging.info(f"Client connected: {peername}")
+        logging.info(f"Active connections: {self.active_connections}")
 
-            task = asyncio.create_task(self.handle_client(reader, writer))
-            task.add_done_callback(cleanup)
+        try:
+            await self.handle_client(reader, writer)
+        except Exception as e:
+            logging.error(f"Exception in client connection: {e}")
+        finally:
+            self.active_connections -= 1
+            self.admission.release(ip)
+            self.metric_active.dec()
+            self.metric_global_active.set(self.connection_slots.in_use)
+            logging.info(f"Client disconnected: {peername}")
+            logging.info(f"Active connections: {self.active_connections}")
 
     async def handle_client(self, reader, writer):
         try:
@@ -55,7 +399,7 @@ class ProblemServer:
                                    timeout=self.CONNECTION_TIMEOUT)
         except asyncio.TimeoutError:
             logging.warning("Client connection timed out.")
-            writer.write("Connection timed out\r\n".encode())
+            self.write(writer, "Connection timed out\r\n".encode())
             writer.close()
             await writer.wait_closed()
 
@@ -70,131 +414,326 @@ Find the LCS length between two DNA sequences to unlock each level.
 The timer gets shorter as you progress!
 
 DNA sequences use bases: A, C, G, T
-You need to solve 4 pattern locks to get the flag.
+You need to solve 7 pattern locks to get the flag.
 Format your answer as a single integer (LCS length).
+The reconstruction lock asks for an actual LCS string instead, and the
+last two locks ask for the edit distance and the shortest diff size.
 """
-        writer.write(welcome.encode())
-        await writer.drain()
+        self.write(writer, welcome.encode())
+        await self.drain(writer)
 
-        # Process each level
-        for level in range(1, 5):
-            writer.write(f"\n--- Lock Level {level} ---\n".encode())
-            writer.write(f"⏰ TIME LIMIT: {self.TIME_LIMITS[level]} seconds!\n".encode())
-            await writer.drain()
+        options = SessionOptions()
 
-            # Generate challenge
-            seq1, seq2 = self.generate_challenge(level)
-            expected = self.longest_common_subsequence(seq1, seq2)
+        # Process each level (an option command as the first line restarts level 1 after negotiating)
+        levels = sorted(self.LEVEL_KINDS)
+        index = 0
+        while index < len(levels):
+            level = levels[index]
+            self.write(writer, f"\n--- Lock Level {level} ---\n".encode())
+            self.write(writer, f"⏰ TIME LIMIT: {self.TIME_LIMITS[level]} seconds!\n".encode())
+            await self.drain(writer)
 
-            # Send challenge
-            challenge = f"DNA Sequence 1: {seq1}\n"
-            challenge += f"DNA Sequence 2: {seq2}\n"
-            challenge += f"LCS Length: "
+            # Take a pre-generated challenge
+            lock = await self.challenge_pool.take(level)
 
-            writer.write(challenge.encode())
-            await writer.drain()
+            # Send challenge
+            if options.packed:
+                challenge = f"DNA Sequence 1 (packed {len(lock.seq1)}): {lock.seq1.to_base64()}\n"
+                challenge += f"DNA Sequence 2 (packed {len(lock.seq2)}): {lock.seq2.to_base64()}\n"
+            else:
+                challenge = f"DNA Sequence 1: {lock.seq1}\n"
+                challenge += f"DNA Sequence 2: {lock.seq2}\n"
+            challenge += self.PROMPTS[lock.kind]
+
+            send_started = asyncio.get_event_loop().time()
+            self.write(writer, challenge.encode())
+            await self.drain(writer)
+            send_time = asyncio.get_event_loop().time() - send_started
+            self.metric_challenge_send.observe(send_time, level=level)
+
+            # With a measured RTT the limit covers the reply's trip back as well
+            rtt_allowance = min(options.rtt, self.MAX_RTT_COMPENSATION) if options.rtt is not None else 0.0
 
             try:
                 # Wait for response with timeout
                 start_time = asyncio.get_event_loop().time()
-                response = await asyncio.wait_for(
-                    self.readLine(reader),
-                    timeout=self.TIME_LIMITS[level]
+                response, first_byte_at = await asyncio.wait_for(
+                    self.read_answer(reader),
+                    timeout=self.TIME_LIMITS[level] + rtt_allowance
                 )
-                elapsed_time = asyncio.get_event_loop().time() - start_time
-
-                user_answer = int(response.strip())
-
-                if user_answer == expected:
-                    writer.write(f"\n✅ Lock opened in {elapsed_time:.1f} seconds! LCS length is {expected}\n".encode())
+                if options.accept_options:
+                    options.accept_options = False
+                    command = response.split()
+                    if command and command[0] in self.OPTION_COMMANDS:
+                        options = await self.negotiate(reader, writer, response)
+                        continue
+                line_time = asyncio.get_event_loop().time() - start_time
+                first_byte_time = first_byte_at - start_time
+                elapsed_time = max(0.0, line_time - rtt_allowance)
+
+                self.metric_answer_first_byte.observe(first_byte_time, level=level)
+                self.metric_answer_latency.observe(line_time, level=level)
+                if options.rtt is not None:
+                    self.metric_answer_compute.observe(elapsed_time, level=level)
+                logging.debug(f"Level {level} timing: send={send_time * 1000:.1f}ms "
+                              f"first_byte={first_byte_time * 1000:.1f}ms line={line_time * 1000:.1f}ms "
+                              f"rtt={(options.rtt or 0) * 1000:.1f}ms", extra={'event': 'timing'})
+
+                correct, feedback = self.grade_response(lock, response)
+
+                if correct:
+                    self.write(writer, f"\n✅ Lock opened in {elapsed_time:.1f} seconds! {feedback}\n".encode())
 
                     # Bonus message for fast solvers
                     if elapsed_time < self.TIME_LIMITS[level] * 0.5:
-                        writer.write(
+                        self.write(writer,
                             f"🌟 AMAZING SPEED! You used only {int(elapsed_time / self.TIME_LIMITS[level] * 100)}% of the time!\n".encode()
                         )
-                    await writer.drain()
-                    logging.info(f"Level {level}: Correct answer in {elapsed_time:.1f}s")
+                    await self.drain(writer)
+                    self.metric_level_results.inc(level=level, result='correct')
+                    logging.info(f"Level {level}: Correct answer in {elapsed_time:.1f}s", extra={'event': 'answer'})
+                    index += 1
                 else:
-                    writer.write(f"\n❌ Lock failed! Expected {expected}, got {user_answer}\n".encode())
-                    await writer.drain()
-                    logging.info(f"Level {level}: Wrong answer")
+                    self.write(writer, f"\n❌ Lock failed! {feedback}\n".encode())
+                    await self.drain(writer)
+                    self.metric_level_results.inc(level=level, result='wrong')
+                    logging.info(f"Level {level}: Wrong answer", extra={'event': 'answer'})
                     writer.close()
                     await writer.wait_closed()
                     return
 
             except asyncio.TimeoutError:
-                writer.write(f"\n❌ TIME'S UP! No answer received within {self.TIME_LIMITS[level]} seconds!\n".encode())
-                await writer.drain()
-                logging.warning(f"Level {level}: Timeout")
+                self.write(writer, f"\n❌ TIME'S UP! No answer received within {self.TIME_LIMITS[level]} seconds!\n".encode())
+                await self.drain(writer)
+                self.metric_level_results.inc(level=level, result='timeout')
+                logging.warning(f"Level {level}: Timeout (challenge send took {send_time * 1000:.1f}ms)")
                 writer.close()
                 await writer.wait_closed()
                 return
             except ValueError:
-                writer.write("\n❌ Invalid input format!\n".encode())
-                await writer.drain()
+                self.write(writer, "\n❌ Invalid input format!\n".encode())
+                await self.drain(writer)
+                self.metric_level_results.inc(level=level, result='invalid')
                 logging.warning(f"Level {level}: Invalid input")
                 writer.close()
                 await writer.wait_closed()
                 return
 
         # All locks opened
-        writer.write(f"\n🎉 ALL LOCKS CRACKED! Here's your flag: {self.FLAG}\n".encode())
-        writer.write("You're a true speed solver!\n".encode())
-        await writer.drain()
+        self.write(writer, f"\n🎉 ALL LOCKS CRACKED! Here's your flag: {self.FLAG}\n".encode())
+        self.write(writer, "You're a true speed solver!\n".encode())
+        await self.drain(writer)
         logging.info("All levels completed! Flag delivered!")
 
         writer.close()
         await writer.wait_closed()
 
-    async def readLine(self, reader):
-        """Read a line from the reader"""
-        data = await reader.readline()
-        return data.decode()
+    async def negotiate(self, reader, writer, first_line: str) -> SessionOptions:
+        """Handle option commands from the session's first line up to START
+
+        Level 1 starts right after the welcome without waiting for options, so
+        clients that send nothing get the plain text format with no delay. When
+        the first line is an option command, lines are read until START and
+        level 1 is then restarted with the negotiated options.
+
+          PACKED   send sequences 2-bit packed and base64 encoded
+          PING     measure the round-trip time with PING <n> / PONG <n> exchanges;
+                   each level's time limit is extended by the RTT (capped)
+          START    end negotiation; the server replies START OK and restarts level 1
+        """
+        options = SessionOptions()
+        options.accept_options = False
+        line = first_line
+
+        # Level 1's answer prompt is still open, so the replies start on a new line
+        self.write(writer, b"\n")
+
+        while True:
+            command = line.split()
+            if command[:1] == ['START']:
+                self.write(writer, b"START OK\n")
+                await self.drain(writer)
+                break
+
+            if command:
+                if command == ['PACKED']:
+                    options.packed = True
+                    reply = "PACKED OK\n"
+                    logging.info("Client negotiated packed sequences")
+                elif command == ['PING']:
+                    options.rtt = await self.measure_rtt(reader, writer)
+                    if options.rtt is None:
+                        reply = "PING FAILED\n"
+                    else:
+                        self.metric_rtt.observe(options.rtt)
+                        reply = f"RTT {options.rtt * 1000:.1f} ms\n"
+                        logging.info(f"Client RTT {options.rtt * 1000:.1f}ms")
+                else:
+                    reply = f"Unknown option: {' '.join(command)[:20]}\n"
 
-    def generate_dna_sequence(self, length: int) -> str:
-        """Generate random DNA sequence"""
-        return ''.join(random.choice(self.DNA_BASES) for _ in range(length))
+                self.write(writer, reply.encode())
+                await self.drain(writer)
 
-    def generate_challenge(self, level: int) -> Tuple[str, str]:
-        """Generate DNA sequences based on difficulty"""
-        if level == 1:
-            # Short sequences
-            len1 = random.randint(8, 12)
-            len2 = random.randint(8, 12)
-        elif level == 2:
-            # Medium sequences
-            len1 = random.randint(15, 25)
-            len2 = random.randint(15, 25)
-        elif level == 3:
-            # Long sequences
-            len1 = random.randint(30, 40)
-            len2 = random.randint(30, 40)
-        else:  # level 4
-            # Very long sequences
-            len1 = random.randint(50, 70)
-            len2 = random.randint(50, 70)
-
-        seq1 = self.generate_dna_sequence(len1)
-        seq2 = self.generate_dna_sequence(len2)
+            line = (await reader.readline()).decode(errors='ignore')
+            if not line:
+                break
 
-        return seq1, seq2
+        return options
 
-    def longest_common_subsequence(self, s1: str, s2: str) -> int:
-        """Calculate LCS length using dynamic programming"""
-        m, n = len(s1), len(s2)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
+    async def measure_rtt(self, reader, writer) -> Optional[float]:
+        """Time PING_SAMPLES PING/PONG exchanges and return the RTT to credit (None if the client fails)
 
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if s1[i - 1] == s2[j - 1]:
-                    dp[i][j] = dp[i - 1][j - 1] + 1
-                else:
-                    dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+        The client decides when to answer a PING, so a held-back PONG could buy
+        extra time. The result is therefore capped by the RTT the kernel measured
+        from TCP ACKs, which the client application cannot delay.
+        """
+        loop = asyncio.get_running_loop()
+        samples = []
+
+        for sequence in range(1, self.PING_SAMPLES + 1):
+            sent_at = loop.time()
+            self.write(writer, f"PING {sequence}\n".encode())
+            await self.drain(writer)
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=self.PING_TIMEOUT)
+            except asyncio.TimeoutError:
+                return None
+            if line.decode(errors='ignore').split() != ['PONG', str(sequence)]:
+                return None
+            samples.append(loop.time() - sent_at)
+
+        rtt = min(samples)
+        kernel_rtt = self.kernel_rtt(writer)
+        if kernel_rtt is not None:
+            rtt = min(rtt, kernel_rtt)
+        return rtt
+
+    def kernel_rtt(self, writer) -> Optional[float]:
+        """Minimum (or, on older kernels, smoothed) RTT of the connection from TCP_INFO
+
+        Returns None where TCP_INFO is unavailable.
+        """
+        sock = writer.get_extra_info('socket')
+        if sock is None or not hasattr(socket, 'TCP_INFO'):
+            return None
+        try:
+            info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, self.TCP_INFO_MIN_RTT_OFFSET + 4)
+        except OSError:
+            return None
+        for offset in (self.TCP_INFO_MIN_RTT_OFFSET, self.TCP_INFO_RTT_OFFSET):
+            if len(info) >= offset + 4:
+                return struct.unpack_from('I', info, offset)[0] / 1_000_000
+        return None
+
+    async def read_answer(self, reader) -> Tuple[str, float]:
+        """Read one answer line, returning it with the loop time its first byte arrived"""
+        first = await reader.read(1)
+        first_byte_at = asyncio.get_event_loop().time()
+        if first in (b'', b'\n'):
+            return first.decode(), first_byte_at
+        rest = await reader.readline()
+        return (first + rest).decode(), first_byte_at
+
+    def write(self, writer, data: bytes) -> None:
+        """Queue data on the writer and count it as sent"""
+        writer.write(data)
+        self.metric_bytes_sent.inc(len(data))
+
+    async def drain(self, writer) -> None:
+        """Wait for the send buffer to drain, recording how long it took"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await writer.drain()
+        self.metric_drain_wait.observe(loop.time() - started)
+
+    @classmethod
+    def build_challenge(cls, level: int) -> Challenge:
+        """Generate a level's sequences together with the reference answer (runs in the process pool)"""
+        kind = cls.LEVEL_KINDS[level]
+        seq1, seq2 = cls.generate_challenge(level)
+
+        if kind == 'sequence':
+            lcs = hirschberg_lcs(seq1.to_text(), seq2.to_text())
+            return Challenge(kind, seq1, seq2, len(lcs), lcs)
+        if kind == 'edit':
+            return Challenge(kind, seq1, seq2, ukkonen_edit_distance(seq1.to_text(), seq2.to_text()))
+        if kind == 'diff':
+            return Challenge(kind, seq1, seq2, diff_size(myers_diff(seq1.to_text(), seq2.to_text())))
+        return Challenge(kind, seq1, seq2, cls.longest_common_subsequence(seq1, seq2))
+
+    @classmethod
+    def grade_response(cls, challenge: Challenge, response: str) -> Tuple[bool, str]:
+        """Grade an answer, returning (correct, feedback); raises ValueError on malformed input"""
+        answer = response.strip()
+
+        if challenge.kind != 'sequence':
+            user_answer = int(answer)
+            if user_answer == challenge.answer:
+                return True, f"{cls.ANSWER_NAMES[challenge.kind]} is {user_answer}"
+            return False, f"Expected {challenge.answer}, got {user_answer}"
+
+        if answer.strip(cls.DNA_BASES):
+            raise ValueError("answer contains non-DNA characters")
+        if len(answer) != challenge.answer:
+            return False, f"Expected an LCS of length {challenge.answer}, got length {len(answer)}"
+        if not (is_subsequence(answer, challenge.seq1.to_text())
+                and is_subsequence(answer, challenge.seq2.to_text())):
+            return False, "Answer is not a common subsequence of both sequences"
+        return True, f"Found an LCS of length {len(answer)}"
+
+    @classmethod
+    def generate_dna_sequence(cls, length: int) -> PackedSequence:
+        """Generate random DNA sequence"""
+        return PackedSequence.random(length)
+
+    @classmethod
+    def mutate_sequence(cls, seq: str, mutations: int) -> str:
+        """Apply random substitutions, insertions and deletions"""
+        bases = list(seq)
+        for _ in range(mutations):
+            position = random.randrange(len(bases) + 1)
+            operation = random.choice('sid')
+            if operation == 'i' or position == len(bases):
+                bases.insert(position, random.choice(cls.DNA_BASES))
+            elif operation == 's':
+                bases[position] = random.choice(cls.DNA_BASES.replace(bases[position], ''))
+            else:
+                del bases[position]
+        return ''.join(bases)
+
+    @classmethod
+    def generate_challenge(cls, level: int) -> Tuple[PackedSequence, PackedSequence]:
+        """Generate DNA sequences based on difficulty"""
+        low, high = cls.LEVEL_LENGTHS[level]
+        seq1 = cls.generate_dna_sequence(random.randint(low, high))
+
+        if level in cls.LEVEL_MUTATIONS:
+            # Edit distance and diff locks compare a sequence with a lightly mutated copy
+            mutations = random.randint(*cls.LEVEL_MUTATIONS[level])
+            seq2 = PackedSequence.from_text(cls.mutate_sequence(seq1.to_text(), mutations))
+        else:
+            seq2 = cls.generate_dna_sequence(random.randint(low, high))
+
+        return seq1, seq2
 
-        return dp[m][n]
+    @classmethod
+    def longest_common_subsequence(cls, s1, s2) -> int:
+        """Calculate LCS length (bit-parallel kernel; packed sequences use their own masks)"""
+        return lcs_length(s1, s2)
 
 
 if __name__ == '__main__':
-    server = ProblemServer(host='0.0.0.0', port=10402)
-    asyncio.run(server.run())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Pattern Lock Decoder server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=10402)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of SO_REUSEPORT worker processes (default: 1, no fork)')
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        run_workers(lambda slots, worker_id: ProblemServer(args.host, args.port, slots, worker_id),
+                    ProblemServer.MAX_CONNECTIONS, args.workers, LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
+    else:
+        setup_logging(LOG_SAMPLE_RATES, LOG_RATE_LIMITS)
+        server = ProblemServer(host=args.host, port=args.port)
+        asyncio.run(server.run())
\ No newline at end of file
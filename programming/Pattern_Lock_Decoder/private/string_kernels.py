@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+String algorithm kernels for DNA sequences (alphabet ACGT)
+
+Shared by the Pattern Lock Decoder server and its solver. Sequences are plain
+strings, or any object with len(), iteration over its bases and a
+match_masks() method (such as the server's PackedSequence).
+"""
+
+import itertools
+from typing import List, Tuple
+
+DNA_BASES = 'ACGT'
+
+# str.translate tables turning a DNA sequence into a 0/1 string per base
+MATCH_TABLES = {base: str.maketrans(DNA_BASES, ''.join('1' if b == base else '0' for b in DNA_BASES))
+                for base in DNA_BASES}
+
+# Inverts a binary string so that cleared bits count as 1
+BIT_FLIP = str.maketrans('01', '10')
+
+
+def match_masks(seq) -> dict:
+    """Bit mask of the positions of each base in seq (bit i = seq[i])"""
+    if hasattr(seq, 'match_masks'):
+        return seq.match_masks()
+    if not seq:
+        return {base: 0 for base in DNA_BASES}
+    reversed_seq = seq[::-1]
+    return {base: int(reversed_seq.translate(table), 2)
+            for base, table in MATCH_TABLES.items()}
+
+
+# --- Longest common subsequence ---
+
+def lcs_length(s1, s2) -> int:
+    """LCS length with the bit-parallel algorithm (Allison-Dix / Hyyrö)
+
+    Each bit of v stands for one position of the longer sequence, and every
+    character of the other sequence updates all of them with a handful of
+    big-int operations: O(m * n / w) time and O(m) memory.
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if not s2:
+        return 0
+
+    masks = match_masks(s1)
+    all_bits = (1 << len(s1)) - 1
+    v = all_bits
+    for ch in s2:
+        u = v & masks[ch]
+        v = ((v + u) | (v - u)) & all_bits
+
+    # Each cleared bit is one matched character
+    return len(s1) - v.bit_count()
+
+
+def lcs_prefix_row(s1: str, s2: str) -> List[int]:
+    """LCS lengths of every prefix of s1 against s2: row[i] = LCS(s1[:i], s2)
+
+    Same bit-parallel recurrence with the bits over s1; afterwards the
+    number of cleared bits below position i is LCS(s1[:i], s2).
+    """
+    if not s1:
+        return [0]
+
+    masks = match_masks(s1)
+    all_bits = (1 << len(s1)) - 1
+    v = all_bits
+    for ch in s2:
+        u = v & masks[ch]
+        v = ((v + u) | (v - u)) & all_bits
+
+    bits = format(v, 'b').zfill(len(s1))[::-1].translate(BIT_FLIP)
+    return [0, *itertools.accumulate(map(int, bits))]
+
+
+def hirschberg_lcs(s1: str, s2: str) -> str:
+    """Reconstruct one LCS in linear space (Hirschberg divide and conquer)
+
+    s2 is split in half; a forward row for the first half and a backward
+    row for the second half pick the split point of s1 that an optimal
+    alignment passes through, then both halves are solved recursively.
+    Only O(len(s1) + len(s2)) rows are alive at any time.
+    """
+    if not s1 or not s2:
+        return ''
+    if len(s2) == 1:
+        return s2 if s2 in s1 else ''
+
+    mid = len(s2) // 2
+    forward = lcs_prefix_row(s1, s2[:mid])
+    backward = lcs_prefix_row(s1[::-1], s2[mid:][::-1])
+
+    m = len(s1)
+    split = max(range(m + 1), key=lambda i: forward[i] + backward[m - i])
+    return hirschberg_lcs(s1[:split], s2[:mid]) + hirschberg_lcs(s1[split:], s2[mid:])
+
+
+def is_subsequence(candidate: str, seq: str) -> bool:
+    """Check that candidate is a subsequence of seq in O(len(candidate) + len(seq))"""
+    position = 0
+    for ch in candidate:
+        position = seq.find(ch, position) + 1
+        if position == 0:
+            return False
+    return True
+
+
+# --- Edit distance ---
+
+def banded_edit_distance(s1: str, s2: str, band: int) -> int:
+    """Levenshtein distance restricted to diagonals |j - i| <= band
+
+    Exact whenever the distance is at most band; otherwise returns band + 1.
+    O((m + n) * band) time and O(band) memory.
+    """
+    m, n = len(s1), len(s2)
+    limit = band + 1
+    if abs(m - n) > band:
+        return limit
+
+    # Row i keeps columns j = i - band .. i + band at index j - i + band
+    width = 2 * band + 1
+    prev = [limit] * width
+    for j in range(min(n, band) + 1):
+        prev[j + band] = j
+
+    for i in range(1, m + 1):
+        cur = [limit] * width
+        if i <= band:
+            cur[band - i] = i
+        ch = s1[i - 1]
+        for j in range(max(1, i - band), min(n, i + band) + 1):
+            k = j - i + band
+            best = prev[k] + (ch != s2[j - 1])
+            if k + 1 < width and prev[k + 1] + 1 < best:
+                best = prev[k + 1] + 1
+            if k > 0 and cur[k - 1] + 1 < best:
+                best = cur[k - 1] + 1
+            cur[k] = best
+        prev = cur
+
+    return min(prev[n - m + band], limit)
+
+
+def ukkonen_edit_distance(s1: str, s2: str) -> int:
+    """Levenshtein distance in O((m + n) * d) with Ukkonen's doubling band
+
+    An alignment that leaves the diagonal band costs more than the band
+    width, so a banded result within the band is exact; otherwise the band
+    is doubled. Cost grows with the distance d instead of m * n.
+    """
+    band = max(1, abs(len(s1) - len(s2)))
+    while True:
+        distance = banded_edit_distance(s1, s2, band)
+        if distance <= band:
+            return distance
+        band *= 2
+
+
+def bit_parallel_edit_distance(s1, s2) -> int:
+    """Levenshtein distance with Myers' bit-vector algorithm (Hyyrö's formulation)
+
+    pv/mv hold the +1/-1 vertical deltas of a whole DP column over s1, so each
+    character of s2 costs a few big-int operations: O(m * n / w) time.
+    """
+    m = len(s1)
+    if not m:
+        return len(s2)
+
+    masks = match_masks(s1)
+    all_bits = (1 << m) - 1
+    high_bit = 1 << (m - 1)
+    pv, mv = all_bits, 0
+    score = m
+
+    for ch in s2:
+        eq = masks.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & all_bits)
+        mh = pv & xh
+        if ph & high_bit:
+            score += 1
+        elif mh & high_bit:
+            score -= 1
+        # Row 0 of the table is 0, 1, 2, ... so a +1 delta enters at the bottom
+        ph = ((ph << 1) | 1) & all_bits
+        mh = (mh << 1) & all_bits
+        pv = mh | (~(xv | ph) & all_bits)
+        mv = ph & xv
+
+    return score
+
+
+# --- Diff ---
+
+def myers_diff(a: str, b: str) -> List[Tuple[str, str]]:
+    """Shortest insert/delete edit script from a to b (Myers' O(ND) greedy algorithm)
+
+    Returns runs of ('=', text), ('-', text) and ('+', text). Keeps one
+    frontier per edit step for the backtrack, so memory is O(D^2).
+    """
+    n, m = len(a), len(b)
+    frontier = {1: 0}
+    trace = []
+
+    for d in range(n + m + 1):
+        trace.append(frontier.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and frontier[k - 1] < frontier[k + 1]):
+                x = frontier[k + 1]
+            else:
+                x = frontier[k - 1] + 1
+            y = x - k
+            # Follow the snake of matching characters
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            frontier[k] = x
+            if x >= n and y >= m:
+                return _diff_backtrack(a, b, trace, d)
+
+    return []
+
+
+def _diff_backtrack(a: str, b: str, trace: List[dict], distance: int) -> List[Tuple[str, str]]:
+    ops = []
+    x, y = len(a), len(b)
+
+    for d in range(distance, 0, -1):
+        frontier = trace[d]
+        k = x - y
+        if k == -d or (k != d and frontier[k - 1] < frontier[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = frontier[prev_k]
+        prev_y = prev_x - prev_k
+
+        while x > prev_x and y > prev_y:
+            ops.append(('=', a[x - 1]))
+            x -= 1
+            y -= 1
+        if x == prev_x:
+            ops.append(('+', b[y - 1]))
+        else:
+            ops.append(('-', a[x - 1]))
+        x, y = prev_x, prev_y
+
+    while x > 0 and y > 0:
+        ops.append(('=', a[x - 1]))
+        x -= 1
+        y -= 1
+
+    # Merge single-character steps into runs
+    script = []
+    for op, text in reversed(ops):
+        if script and script[-1][0] == op:
+            script[-1] = (op, script[-1][1] + text)
+        else:
+            script.append((op, text))
+    return script
+
+
+def diff_size(script: List[Tuple[str, str]]) -> int:
+    """Number of inserted plus deleted characters in an edit script"""
+    return sum(len(text) for op, text in script if op != '=')
@@ -3,27 +3,27 @@
 Simple solver for Pattern Lock Decoder challenge
 """
 
+import base64
+import os
 import socket
 import re
 import sys
 
+# Share the string algorithm kernels with the server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'private'))
+from string_kernels import bit_parallel_edit_distance, diff_size, hirschberg_lcs, lcs_length, myers_diff
 
-def lcs_length(s1, s2):
-    """Calculate LCS length using dynamic programming"""
-    m, n = len(s1), len(s2)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
+PROMPTS = ("LCS Length: ", "LCS Sequence: ", "Edit Distance: ", "Diff Size: ")
 
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if s1[i - 1] == s2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
 
-    return dp[m][n]
+def unpack_sequence(length, encoded):
+    """Decode a 2-bit packed, base64 encoded sequence (first base in the high bits)"""
+    text = ''.join('ACGT'[(byte >> shift) & 3]
+                   for byte in base64.b64decode(encoded) for shift in (6, 4, 2, 0))
+    return text[:length]
 
 
-def solve(host='localhost', port=10402):
+def solve(host='localhost', port=10402, packed=False, ping=False):
     """Connect and solve the challenge"""
 
     # Connect to server
@@ -31,6 +31,19 @@ def solve(host='localhost', port=10402):
     sock.connect((host, port))
     print(f"Connected to {host}:{port}")
 
+    # Options go out as our first lines; with PING, START is sent once the RTT
+    # has been measured. Level 1 is restarted after START OK.
+    options = b""
+    if packed:
+        options += b"PACKED\n"
+    if ping:
+        options += b"PING\n"
+    elif options:
+        options += b"START\n"
+    negotiating = bool(options)
+    if negotiating:
+        sock.send(options)
+
     # Buffer for receiving data
     buffer = ""
 
@@ -44,8 +57,23 @@ def solve(host='localhost', port=10402):
             buffer += data
             print(data, end='', flush=True)  # Print server output
 
+            # Answer RTT probes right away
+            for probe in re.findall(r'^PING (\d+)$', buffer, re.MULTILINE):
+                sock.send(f"PONG {probe}\n".encode())
+            buffer = re.sub(r'^PING \d+\n', '', buffer, flags=re.MULTILINE)
+            if re.search(r'^(RTT .*|PING FAILED)$', buffer, re.MULTILINE):
+                sock.send(b"START\n")
+                buffer = re.sub(r'^(RTT .*|PING FAILED)\n', '', buffer, flags=re.MULTILINE)
+
+            # Everything before START OK is the level 1 sent before our options arrived
+            if negotiating:
+                if "START OK\n" not in buffer:
+                    continue
+                buffer = buffer.split("START OK\n", 1)[1]
+                negotiating = False
+
             # Check if we need to send an answer
-            if "LCS Length: " in buffer:
+            if any(prompt in buffer for prompt in PROMPTS):
                 # Extract sequences from buffer
                 lines = buffer.split('\n')
                 seq1 = None
@@ -56,10 +84,25 @@ def solve(host='localhost', port=10402):
                         seq1 = line.split("DNA Sequence 1:")[1].strip()
                     elif "DNA Sequence 2:" in line:
                         seq2 = line.split("DNA Sequence 2:")[1].strip()
+                    else:
+                        match = re.match(r'DNA Sequence ([12]) \(packed (\d+)\): (\S*)', line)
+                        if match:
+                            sequence = unpack_sequence(int(match.group(2)), match.group(3))
+                            if match.group(1) == '1':
+                                seq1 = sequence
+                            else:
+                                seq2 = sequence
 
                 if seq1 and seq2:
-                    # Calculate LCS
-                    answer = lcs_length(seq1, seq2)
+                    # Answer whatever this lock asks for
+                    if "LCS Sequence: " in buffer:
+                        answer = hirschberg_lcs(seq1, seq2)
+                    elif "Edit Distance: " in buffer:
+                        answer = bit_parallel_edit_distance(seq1, seq2)
+                    elif "Diff Size: " in buffer:
+                        answer = diff_size(myers_diff(seq1, seq2))
+                    else:
+                        answer = lcs_length(seq1, seq2)
                     print(f"{answer}")  # Show what we're sending
 
                     # Send answer
@@ -88,7 +131,13 @@ def solve(host='localhost', port=10402):
 
 
 if __name__ == "__main__":
-    host = sys.argv[1] if len(sys.argv) > 1 else 'localhost'
-    port = int(sys.argv[2]) if len(sys.argv) > 2 else 10402
+    # --packed: receive sequences in the 2-bit packed encoding
+    # --ping: measure RTT so the time limits are compensated for it
+    packed = '--packed' in sys.argv
+    ping = '--ping' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--packed', '--ping')]
+
+    host = args[0] if len(args) > 0 else 'localhost'
+    port = int(args[1]) if len(args) > 1 else 10402
 
-    solve(host, port)
\ No newline at end of file
+    solve(host, port, packed, ping)
\ No newline at end of file